@@ -2,9 +2,21 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import json
+import os
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
+import churn
+import cube
+import dataset
+import ingest
+import pairs
+import perf
+import radar
+import results
+import store
+
 # --- 1. 페이지 설정 ---
 st.set_page_config(page_title="Who Stopped Importing?", page_icon="🕵️‍♂️", layout="wide")
 
@@ -15,337 +27,381 @@ st.markdown("---")
 
 # --- 2. 데이터 업로드 ---
 uploaded_file = st.sidebar.file_uploader("📂 데이터 파일 업로드 (CSV/Excel)", type=['csv', 'xlsx'])
-
-if uploaded_file:
-    @st.cache_data
-    def load_data(file):
-        if file.name.endswith('.csv'):
-            df = pd.read_csv(file)
+store_dir = st.sidebar.text_input("🗄️ 또는 서버 저장소 경로 (store.py 스트리밍 수집본)", value=os.environ.get("TRADE_STORE_DIR", ""))
+
+# --- 성능 계측 (재실행 단위) ---
+with st.sidebar.expander("⚡ 성능 계측", expanded=False):
+    show_perf = st.toggle("단계별 시간·메모리 패널", help="메모리 추적(tracemalloc) 중에는 재실행이 느려집니다")
+    profile_run = st.toggle("재실행마다 cProfile 저장", value=bool(perf.PROFILE_DIR))
+tracer = perf.begin(trace_memory=show_perf)
+profiler = perf.start_profile() if profile_run else None
+
+# 재실행 도중 위젯 조작으로 스크립트가 중단돼도(Streamlit이 예외로 멈춤) 계측·프로파일러는 반드시 정리한다
+try:
+    if store_dir and not uploaded_file and not store.is_store(store_dir):
+        st.error(f"🗄️ 저장소를 찾을 수 없습니다: `{store_dir}` (manifest.json 없음). store.py로 수집한 디렉터리 경로를 입력해 주세요.")
+        store_dir = ""
+
+    if uploaded_file or store_dir:
+        @st.cache_resource(show_spinner="데이터를 불러오는 중...")
+        def load_data(file):
+            # 내용 해시 기준 컬럼형 캐시: 같은 파일은 재파싱 없이 메모리 맵으로 로드
+            # 날짜순 정렬 데이터셋은 세션 간 공유하며 재실행마다 복사하지 않는다
+            df, data_hash = ingest.load_cached(file.getvalue(), file.name)
+            return dataset.TradeDataset(df), data_hash
+
+        @st.cache_resource(show_spinner="거래 큐브를 만드는 중...")
+        def load_cube(data_hash, _trade_data):
+            # 데이터셋당 한 번: 기간 비교는 원본 행 대신 큐브의 누적합으로 계산
+            return cube.TradeCube.build(_trade_data.frame)
+
+        @st.cache_resource(show_spinner="저장소 큐브를 불러오는 중...")
+        def load_store(data_hash, store_dir):
+            return store.load_cube(store_dir)
+
+        def paginated_summary(index, noun, key, formatter, page_sizes=(20, 50, 100, 200)):
+            # 전체 결과 대신 한 페이지 분량의 업체 목록만 화면에 보낸다 (정렬은 상세 표와 같은 타격 순)
+            # 반환: 거래선 상세를 펼칠 업체 행 (선택한 행, 또는 '모두 펼치기'면 페이지 전체)
+            page_col, size_col, expand_col = st.columns([1, 1, 2])
+            page_size = size_col.selectbox(f"페이지당 {noun} 수 (상위 N)", page_sizes, key=f"{key}_page_size")
+            pages = max(1, -(-len(index) // page_size))
+            # 라벨에 총 페이지 수가 들어가 결과가 바뀌면 1페이지로 돌아간다
+            page = page_col.selectbox(f"{noun} 페이지 (총 {pages:,} · {len(index):,}개사)", list(range(1, pages + 1)))
+            page_df = index.iloc[(page - 1) * page_size: page * page_size]
+            expand_all = expand_col.toggle("이 페이지 거래선 모두 펼치기", key=f"{key}_expand_all")
+            with perf.stage(f'render_{key}_page'):
+                event = st.dataframe(formatter(page_df, trade_cube), use_container_width=True,
+                                     on_select='rerun', selection_mode='multi-row', key=f"{key}_summary")
+            if expand_all:
+                return page_df
+            return page_df.iloc[[row for row in event.selection.rows if row < len(page_df)]]
+
+        @st.cache_resource(show_spinner="1:1 거래선 인덱스를 만드는 중...", max_entries=32)
+        def load_pair_index(selection_key, _trade_cube, _key_ids):
+            # 데이터·필터 조합당 한 번: 수입사 -> 수출사 목록과 쌍별 월별 시계열
+            return pairs.PairIndex(_trade_cube, _key_ids)
+
+        @st.cache_resource
+        def result_cache():
+            # 모든 세션이 공유하는 레이더 결과 캐시 (LRU + 선택적 디스크 계층)
+            return results.ResultCache()
+
+        if uploaded_file:
+            with perf.stage('load'):
+                trade_data, data_hash = load_data(uploaded_file)
+            with perf.stage('cube'):
+                trade_cube = load_cube(data_hash, trade_data)
+            filter_options, last_date = trade_data.options, trade_data.last_date
         else:
-            df = pd.read_excel(file)
-        df['Date'] = pd.to_datetime(df['Date'])
-        return df
-
-    df = load_data(uploaded_file)
+            # 원본 행은 메모리에 올리지 않고 큐브만 사용 (원본은 연/월 파티션에서 필요할 때만 읽음)
+            with st.sidebar.expander("➕ 월간 추가분 반영 (append)", expanded=False):
+                delta_file = st.file_uploader("추가분 CSV", type=['csv'], key="delta_file")
+                if delta_file and st.button("저장소에 반영"):
+                    # 추가분만 중복 제거 후 반영 -> 저장소 해시가 바뀌어 큐브를 새로 불러온다
+                    result = store.append_csv(delta_file, store_dir)
+                    st.success(f"{result['appended']:,}행 추가 (중복 {result['duplicates']:,}행 제외)")
+            with perf.stage('load'):
+                data_hash = store.read_manifest(store_dir)['hash']
+                trade_cube = load_store(data_hash, store_dir)
+            filter_options = {column: trade_cube.values(column) for column in dataset.FILTER_COLUMNS}
+            last_date = trade_cube.last_date
     
-    with st.sidebar:
-        st.header("⏱️ 기준일 설정")
-        ref_date_option = st.radio(
-            "기간을 계산할 '오늘'의 기준을 선택하세요",
-            ["데이터 최신 날짜 기준 (권장)", "서버 현재 시간 (오늘)"]
-        )
-        if ref_date_option == "데이터 최신 날짜 기준 (권장)":
-            today = df['Date'].max().date()
-        else:
-            today = datetime.now().date()
+        with st.sidebar:
+            st.header("⏱️ 기준일 설정")
+            ref_date_option = st.radio(
+                "기간을 계산할 '오늘'의 기준을 선택하세요",
+                ["데이터 최신 날짜 기준 (권장)", "서버 현재 시간 (오늘)"]
+            )
+            if ref_date_option == "데이터 최신 날짜 기준 (권장)":
+                today = last_date.date()
+            else:
+                today = datetime.now().date()
 
-        st.markdown("---")
-        st.header("🔍 상세 필터 설정")
-        def multiselect_filter(label, column):
-            options = df[column].dropna().unique().tolist()
-            return st.multiselect(label, options, default=[])
-
-        hs_codes = multiselect_filter("HS-CODE", "HS-CODE")
-        categories = multiselect_filter("Category", "Category")
-        origin_countries = multiselect_filter("Origin Country", "Origin Country")
+            st.markdown("---")
+            st.header("🔍 상세 필터 설정")
+            def multiselect_filter(label, column):
+                options = filter_options[column]
+                return st.multiselect(label, options, default=[])
+
+            hs_codes = multiselect_filter("HS-CODE", "HS-CODE")
+            categories = multiselect_filter("Category", "Category")
+            origin_countries = multiselect_filter("Origin Country", "Origin Country")
         
-        st.markdown("---")
-        st.header("📅 롤링 기간 설정")
-        period_option = st.selectbox(
-            "비교 기간 선택 (최근 vs 직전)",
-            ["최근 1개월", "최근 3개월", "최근 6개월", "최근 1년", "최근 3년", "직접 입력"]
-        )
+            st.markdown("---")
+            st.header("📅 롤링 기간 설정")
+            analysis_mode = st.radio("분석 모드", ["단일 기간 비교", "월말 이탈 시계열"], horizontal=True)
+            period_option = st.selectbox(
+                "비교 기간 선택 (최근 vs 직전)",
+                list(radar.PERIOD_LENGTHS) + ["직접 입력"],
+                disabled=analysis_mode == "월말 이탈 시계열"
+            )
 
-        st.markdown("---")
-        with st.expander("📖 활용 설명 (컬럼 안내)", expanded=False):
-            st.markdown("""
-            **[공통 지표]**
-            - **최근/직전 수입량**: 필터에서 설정한 비교 기간 동안의 '1:1 거래' 기준 수입 중량 (KG)
-            - **과거 평균 수량**: 전체 데이터 기간을 기준으로 한 1:1 거래의 통상적인 평균 수입 중량
+            st.markdown("---")
+            with st.expander("📖 활용 설명 (컬럼 안내)", expanded=False):
+                st.markdown("""
+                **[공통 지표]**
+                - **최근/직전 수입량**: 필터에서 설정한 비교 기간 동안의 '1:1 거래' 기준 수입 중량 (KG)
+                - **과거 평균 수량**: 전체 데이터 기간을 기준으로 한 1:1 거래의 통상적인 평균 수입 중량
             
-            **[수입업체 표 - 💡공급선 변경 추적]**
-            - **추출 기준**: '전체 수입량'이 과거 대비 감소한 한국 수입사만 독자적으로 색출합니다.
-            - **세부 추이**: 각 수입사의 세부 거래선별로 🔼물량 확대(대체/환승), 🆕신규 거래, 🔽물량 축소, 🛑거래 중단 여부를 보여줍니다.
+                **[수입업체 표 - 💡공급선 변경 추적]**
+                - **추출 기준**: '전체 수입량'이 과거 대비 감소한 한국 수입사만 독자적으로 색출합니다.
+                - **세부 추이**: 각 수입사의 세부 거래선별로 🔼물량 확대(대체/환승), 🆕신규 거래, 🔽물량 축소, 🛑거래 중단 여부를 보여줍니다.
             
-            **[수출사 표 - 💡한국 시장 이탈 추적]**
-            - **추출 기준**: 수입사 이탈 여부와 관계없이, 한국으로 보내는 '전체 수출량' 자체가 감소한 해외 수출사만 독자적으로 색출합니다.
-            - **세부 추이**: 해당 수출사가 기존 한국 수입사와의 거래가 축소/중단(🔽/🛑)되었는지, 혹은 다른 한국 수입사로 공급을 확대(🔼/🆕)하여 파이프라인을 전환했는지 파악합니다.
-            """)
-
-    # 기본 필터 적용
-    filtered_df = df.copy()
-    if hs_codes: filtered_df = filtered_df[filtered_df['HS-CODE'].isin(hs_codes)]
-    if categories: filtered_df = filtered_df[filtered_df['Category'].isin(categories)]
-    if origin_countries: filtered_df = filtered_df[filtered_df['Origin Country'].isin(origin_countries)]
-
-    # --- 3. 기간 계산 ---
-    curr_end = today
-    if period_option == "최근 1개월":
-        curr_start = curr_end - relativedelta(months=1) + relativedelta(days=1)
-        past_end = curr_start - relativedelta(days=1)
-        past_start = past_end - relativedelta(months=1) + relativedelta(days=1)
-    elif period_option == "최근 3개월":
-        curr_start = curr_end - relativedelta(months=3) + relativedelta(days=1)
-        past_end = curr_start - relativedelta(days=1)
-        past_start = past_end - relativedelta(months=3) + relativedelta(days=1)
-    elif period_option == "최근 6개월":
-        curr_start = curr_end - relativedelta(months=6) + relativedelta(days=1)
-        past_end = curr_start - relativedelta(days=1)
-        past_start = past_end - relativedelta(months=6) + relativedelta(days=1)
-    elif period_option == "최근 1년":
-        curr_start = curr_end - relativedelta(years=1) + relativedelta(days=1)
-        past_end = curr_start - relativedelta(days=1)
-        past_start = past_end - relativedelta(years=1) + relativedelta(days=1)
-    elif period_option == "최근 3년":
-        curr_start = curr_end - relativedelta(years=3) + relativedelta(days=1)
-        past_end = curr_start - relativedelta(days=1)
-        past_start = past_end - relativedelta(years=3) + relativedelta(days=1)
-    elif period_option == "직접 입력":
-        curr_dates = st.sidebar.date_input("최근 기간 (Current)", [today - relativedelta(months=1), today])
-        past_dates = st.sidebar.date_input("과거 비교 기간 (Past)", [today - relativedelta(months=2), today - relativedelta(months=1)])
-        if len(curr_dates) == 2 and len(past_dates) == 2:
-            curr_start, curr_end = curr_dates[0], curr_dates[1]
-            past_start, past_end = past_dates[0], past_dates[1]
-
-    curr_start, curr_end = pd.to_datetime(curr_start), pd.to_datetime(curr_end)
-    past_start, past_end = pd.to_datetime(past_start), pd.to_datetime(past_end)
-
-    st.markdown("#### ⏳ 분석 기준 기간")
-    col1, col2 = st.columns(2)
-    col1.info(f"**최근 기간 (Current):** {curr_start.strftime('%Y-%m-%d')} ~ {curr_end.strftime('%Y-%m-%d')}")
-    col2.info(f"**직전 비교 기간 (Past):** {past_start.strftime('%Y-%m-%d')} ~ {past_end.strftime('%Y-%m-%d')}")
-
-    # --- 데이터 분리 ---
-    curr_df = filtered_df[(filtered_df['Date'] >= curr_start) & (filtered_df['Date'] <= curr_end)]
-    past_df = filtered_df[(filtered_df['Date'] >= past_start) & (filtered_df['Date'] <= past_end)]
-
-    # =========================================================================
-    # 🌟 수입사 레이더 (수입사 전체 총량 기준 독립 필터링)
-    # =========================================================================
-    imp_curr_vol = curr_df.groupby('Raw Importer Name')['Volume'].sum().reset_index().rename(columns={'Volume': 'Current Volume'})
-    imp_past_vol = past_df.groupby('Raw Importer Name')['Volume'].sum().reset_index().rename(columns={'Volume': 'Past Volume'})
-    imp_result_df = pd.merge(imp_past_vol, imp_curr_vol, on='Raw Importer Name', how='outer').fillna(0)
-    
-    imp_result_df['Volume Decrease'] = imp_result_df['Past Volume'] - imp_result_df['Current Volume']
-    imp_result_df = imp_result_df[imp_result_df['Volume Decrease'] > 0] 
-    imp_result_df['Is Stopped'] = imp_result_df['Current Volume'] == 0
+                **[수출사 표 - 💡한국 시장 이탈 추적]**
+                - **추출 기준**: 수입사 이탈 여부와 관계없이, 한국으로 보내는 '전체 수출량' 자체가 감소한 해외 수출사만 독자적으로 색출합니다.
+                - **세부 추이**: 해당 수출사가 기존 한국 수입사와의 거래가 축소/중단(🔽/🛑)되었는지, 혹은 다른 한국 수입사로 공급을 확대(🔼/🆕)하여 파이프라인을 전환했는지 파악합니다.
+                """)
+
+        # 기본 필터 적용
+        filters = {'HS-CODE': hs_codes, 'Category': categories, 'Origin Country': origin_countries}
+        with perf.stage('filter'):
+            key_ids = trade_cube.select(filters)
+
+        shared_results = result_cache()
+
+        if analysis_mode == "월말 이탈 시계열":
+            # =========================================================================
+            # 🌟 월말 이탈 시계열: 지난 5년 모든 월말 x 롤링 기간을 한 번에 계산
+            # =========================================================================
+            ends = churn.month_ends(today)
+            tracer.context = {'data': data_hash, 'filters': filters, 'churn': [str(ends[0]), str(ends[-1])]}
+            with perf.stage('churn'):
+                churn_df, = shared_results.get_or_compute(
+                    results.result_key(data_hash, filters, [ends[0].to_timestamp(), ends[-1].to_timestamp()], [], kind='churn'),
+                    lambda: (churn.churn_series(trade_cube, key_ids, ends),)
+                )
+
+            st.markdown(f"#### 📆 월말 기준 이탈 시계열 ({ends[0]} ~ {ends[-1]}, 달력 월 기준 최근 N개월 vs 직전 N개월)")
+            churn_metrics = {'Decreased Importers': '감소/중단 수입사 수', 'Stopped Importers': '완전 중단 수입사 수', 'Lost Volume': '증발된 수입량 (KG)'}
+            churn_metric = st.radio("지표", list(churn_metrics), format_func=churn_metrics.get, horizontal=True)
+
+            with perf.stage('render_churn'):
+                fig_churn = px.line(
+                    churn_df, x='Month End', y=churn_metric, color='Window', markers=True,
+                    labels={'Month End': '월말', churn_metric: churn_metrics[churn_metric], 'Window': '비교 기간'}
+                )
+                fig_churn.update_layout(margin=dict(l=0, r=0, t=20, b=0), height=350, dragmode='zoom')
+                st.plotly_chart(fig_churn, use_container_width=True)
+
+                heatmap = churn_df.pivot(index='Window', columns='Month End', values=churn_metric).reindex(list(churn.WINDOW_MONTHS))
+                fig_heat = px.imshow(
+                    heatmap, aspect='auto', color_continuous_scale='Reds',
+                    labels={'x': '월말', 'y': '비교 기간', 'color': churn_metrics[churn_metric]}
+                )
+                fig_heat.update_layout(margin=dict(l=0, r=0, t=20, b=0), height=300)
+                st.plotly_chart(fig_heat, use_container_width=True)
+
+                st.markdown("#### 🧭 감소 수입사 거래선의 세부 추이 (월말별 개수)")
+                trend_window = st.selectbox("비교 기간", list(churn.WINDOW_MONTHS), key="churn_trend_window")
+                trend_df = churn_df[churn_df['Window'] == trend_window].set_index('Month End')[radar.TRENDS]
+                fig_trend = px.bar(trend_df, labels={'Month End': '월말', 'value': '거래선 수', 'variable': '세부 추이'})
+                fig_trend.update_layout(margin=dict(l=0, r=0, t=20, b=0), height=350, barmode='stack')
+                st.plotly_chart(fig_trend, use_container_width=True)
+                st.dataframe(churn_df[churn_df['Window'] == trend_window].drop(columns=['Window']).set_index('Month End'), use_container_width=True)
 
-    if not imp_result_df.empty:
-        target_importers = imp_result_df['Raw Importer Name'].tolist()
-        
-        # KPI & 상단 차트
-        st.markdown("<br>", unsafe_allow_html=True)
-        kpi1, kpi2, kpi3 = st.columns(3)
-        kpi1.metric(label="총 수입 감소/중단 업체 수", value=f"{len(imp_result_df)} 개사")
-        kpi2.metric(label="완전 거래 중단 업체 수", value=f"{len(imp_result_df[imp_result_df['Is Stopped']])} 개사", delta="-100%", delta_color="inverse")
-        kpi3.metric(label="총 증발된 수입량 (KG)", value=f"{imp_result_df['Volume Decrease'].sum():,.2f}")
-        st.markdown("---")
-
-        st.markdown("#### 📊 Top 10 수입 물량 급감 업체 (마우스 드래그 박스 줌인 지원)")
-        chart_df = imp_result_df.sort_values(by='Volume Decrease', ascending=False).head(10)
+        else:
+            # --- 3. 기간 계산 ---
+            if period_option in radar.PERIOD_LENGTHS:
+                (curr_start, curr_end), (past_start, past_end) = radar.period_windows(period_option, today)
+            elif period_option == "직접 입력":
+                curr_dates = st.sidebar.date_input("최근 기간 (Current)", [today - relativedelta(months=1), today])
+                past_dates = st.sidebar.date_input("과거 비교 기간 (Past)", [today - relativedelta(months=2), today - relativedelta(months=1)])
+                if len(curr_dates) == 2 and len(past_dates) == 2:
+                    curr_start, curr_end = curr_dates[0], curr_dates[1]
+                    past_start, past_end = past_dates[0], past_dates[1]
+
+            curr_start, curr_end = pd.to_datetime(curr_start), pd.to_datetime(curr_end)
+            past_start, past_end = pd.to_datetime(past_start), pd.to_datetime(past_end)
+
+            st.markdown("#### ⏳ 분석 기준 기간")
+            col1, col2 = st.columns(2)
+            col1.info(f"**최근 기간 (Current):** {curr_start.strftime('%Y-%m-%d')} ~ {curr_end.strftime('%Y-%m-%d')}")
+            col2.info(f"**직전 비교 기간 (Past):** {past_start.strftime('%Y-%m-%d')} ~ {past_end.strftime('%Y-%m-%d')}")
+
+            # --- 데이터 분리 ---
+            curr_window, past_window = (curr_start, curr_end), (past_start, past_end)
+            # 같은 데이터·필터·기간 조합은 다른 세션이 계산해 둔 표를 그대로 쓴다
+            with perf.stage('radar'):
+                imp_result_df, imp_index, exp_radar, exp_index = shared_results.get_or_compute(
+                    results.result_key(data_hash, filters, curr_window, past_window),
+                    lambda: radar.cube_radar_overview(trade_cube, key_ids, curr_window, past_window)
+                )
+            tracer.context = {'data': data_hash, 'filters': filters, 'current': [str(curr_start.date()), str(curr_end.date())], 'past': [str(past_start.date()), str(past_end.date())]}
+
+            # =========================================================================
+            # 🌟 수입사 레이더 (수입사 전체 총량 기준 독립 필터링)
+            # =========================================================================
+            if not imp_result_df.empty:
+                # KPI & 상단 차트
+                st.markdown("<br>", unsafe_allow_html=True)
+                kpi1, kpi2, kpi3 = st.columns(3)
+                kpi1.metric(label="총 수입 감소/중단 업체 수", value=f"{len(imp_result_df)} 개사")
+                kpi2.metric(label="완전 거래 중단 업체 수", value=f"{len(imp_result_df[imp_result_df['Is Stopped']])} 개사", delta="-100%", delta_color="inverse")
+                kpi3.metric(label="총 증발된 수입량 (KG)", value=f"{imp_result_df['Volume Decrease'].sum():,.2f}")
+                st.markdown("---")
+
+                st.markdown("#### 📊 Top 10 수입 물량 급감 업체 (마우스 드래그 박스 줌인 지원)")
+                chart_df = radar.decode_entities(imp_result_df.sort_values(by='Volume Decrease', ascending=False).head(10), trade_cube)
         
-        fig_bar = px.bar(
-            chart_df, 
-            x='Raw Importer Name', 
-            y='Volume Decrease',
-            labels={'Raw Importer Name': '수입 업체명', 'Volume Decrease': '총 감소량 (KG)'},
-            color_discrete_sequence=['#ff4b4b']
-        )
-        fig_bar.update_layout(
-            xaxis={'categoryorder':'total descending'},
-            margin=dict(l=0, r=0, t=20, b=0),
-            height=350,
-            dragmode='zoom'
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
-
-        # 수입사 표
-        st.markdown("---")
-        st.markdown("#### 📉 수입업체 (Importer) 중심 이탈 현황 (타격이 큰 순서 정렬)")
-
-        imp_detail_df = filtered_df[filtered_df['Raw Importer Name'].isin(target_importers)].copy()
-        imp_detail_df['Export Country'] = imp_detail_df['Export Country'].fillna('Unknown')
-        imp_detail_df['Exporter'] = imp_detail_df['Exporter'].fillna('Unknown')
-        imp_detail_df['Exporter Line'] = "[" + imp_detail_df['Export Country'] + "] " + imp_detail_df['Exporter']
+                fig_bar = px.bar(
+                    chart_df, 
+                    x='Raw Importer Name', 
+                    y='Volume Decrease',
+                    labels={'Raw Importer Name': '수입 업체명', 'Volume Decrease': '총 감소량 (KG)'},
+                    color_discrete_sequence=['#ff4b4b']
+                )
+                fig_bar.update_layout(
+                    xaxis={'categoryorder':'total descending'},
+                    margin=dict(l=0, r=0, t=20, b=0),
+                    height=350,
+                    dragmode='zoom'
+                )
+                with perf.stage('render_chart'):
+                    st.plotly_chart(fig_bar, use_container_width=True)
+
+                # 수입사 표
+                st.markdown("---")
+                st.markdown("#### 📉 수입업체 (Importer) 중심 이탈 현황 (타격이 큰 순서 정렬)")
+
+                expanded_imp = paginated_summary(imp_index, "수입사", "imp", radar.format_importer_index)
+                if len(expanded_imp):
+                    with perf.stage('importer_detail'):
+                        final_imp_df = radar.cube_importer_table(trade_cube, key_ids, expanded_imp['Raw Importer Name'].to_numpy(), curr_window, past_window)
+                    with perf.stage('render_importers'):
+                        st.dataframe(final_imp_df, use_container_width=True)
+                else:
+                    st.caption("👆 수입사 행을 선택하면(또는 '모두 펼치기') 해당 수입사의 거래선 상세를 계산해 보여줍니다.")
 
-        imp_curr_detail = imp_detail_df[(imp_detail_df['Date'] >= curr_start) & (imp_detail_df['Date'] <= curr_end)].groupby(['Raw Importer Name', 'Exporter Line'])['Volume'].sum().reset_index(name='Current Volume')
-        imp_past_detail = imp_detail_df[(imp_detail_df['Date'] >= past_start) & (imp_detail_df['Date'] <= past_end)].groupby(['Raw Importer Name', 'Exporter Line'])['Volume'].sum().reset_index(name='Past Volume')
-        
-        imp_merged = pd.merge(imp_past_detail, imp_curr_detail, on=['Raw Importer Name', 'Exporter Line'], how='outer').fillna(0)
-        imp_merged['Volume Change'] = imp_merged['Current Volume'] - imp_merged['Past Volume']
-        
-        def get_line_trend(row):
-            if row['Past Volume'] == 0 and row['Current Volume'] > 0:
-                return "🆕 신규 거래"
-            elif row['Current Volume'] == 0 and row['Past Volume'] > 0:
-                return "🛑 거래 중단"
-            elif row['Volume Change'] > 0:
-                return "🔼 물량 확대"
-            elif row['Volume Change'] < 0:
-                return "🔽 물량 축소"
             else:
-                return "➖ 유지 (변동 없음)"
-                
-        imp_merged['세부 추이'] = imp_merged.apply(get_line_trend, axis=1)
-
-        imp_period_avg = imp_detail_df.groupby(['Raw Importer Name', 'Exporter Line', imp_detail_df['Date'].dt.to_period('Y')])['Volume'].sum().reset_index()
-        imp_avg_vol = imp_period_avg.groupby(['Raw Importer Name', 'Exporter Line'])['Volume'].mean().reset_index(name='Avg Volume')
-        
-        imp_price_stats = imp_detail_df.groupby(['Raw Importer Name', 'Exporter Line']).apply(
-            lambda x: pd.Series({
-                'Arithmetic Avg Price': x['Unit Price'].mean(),
-                'Weighted Avg Price': x['Value'].sum() / x['Volume'].sum() if x['Volume'].sum() > 0 else 0
-            })
-        ).reset_index()
-
-        final_imp_df = imp_merged.merge(imp_avg_vol, on=['Raw Importer Name', 'Exporter Line'], how='left') \
-                                 .merge(imp_price_stats, on=['Raw Importer Name', 'Exporter Line'], how='left')
-
-        num_cols_imp = ['Current Volume', 'Past Volume', 'Volume Change', 'Avg Volume', 'Arithmetic Avg Price', 'Weighted Avg Price']
-        final_imp_df[num_cols_imp] = final_imp_df[num_cols_imp].round(2)
-
-        imp_total_decrease = final_imp_df.groupby('Raw Importer Name')['Volume Change'].sum().reset_index(name='Total Decrease')
-        final_imp_df = final_imp_df.merge(imp_total_decrease, on='Raw Importer Name')
-        
-        final_imp_df = final_imp_df.sort_values(by=['Total Decrease', 'Raw Importer Name', 'Volume Change'], ascending=[True, True, False])
-        
-        final_imp_df = final_imp_df[['Raw Importer Name', '세부 추이', 'Exporter Line', 'Past Volume', 'Current Volume', 'Volume Change', 'Avg Volume', 'Arithmetic Avg Price', 'Weighted Avg Price']]
-        final_imp_df.rename(columns={
-            'Raw Importer Name': '수입업체명',
-            'Exporter Line': '거래 수출업체',
-            'Past Volume': '직전 수입량',
-            'Current Volume': '최근 수입량',
-            'Volume Change': '거래량 증감 (+/-)',
-            'Avg Volume': '과거 평균 수량',
-            'Arithmetic Avg Price': '산술단가 ($)',
-            'Weighted Avg Price': '가중단가 ($)'
-        }, inplace=True)
-
-        final_imp_df.set_index(['수입업체명'], inplace=True)
-        st.dataframe(final_imp_df, use_container_width=True)
-
-    else:
-        st.success("조건에 맞는 수입 감소/중단 업체가 없습니다. 대단하네요! 🎉")
-
-
-    # =========================================================================
-    # 🌟 수출사 레이더 (수출사 한국 수출 총량 기준 듀얼 독립 필터링) 🌟
-    # =========================================================================
-    st.markdown("---")
-    st.markdown("#### 🔄 수출사(Exporter) 관점: 한국 시장 이탈 및 환승 현황 (타격이 큰 순서 정렬)")
-
-    # 🌟 수출국가 컬럼을 연산 그룹에 포함 🌟
-    curr_df['Export Country'] = curr_df['Export Country'].fillna('Unknown')
-    past_df['Export Country'] = past_df['Export Country'].fillna('Unknown')
-
-    exp_curr_total = curr_df.groupby(['Export Country', 'Exporter'])['Volume'].sum().reset_index(name='Current Total')
-    exp_past_total = past_df.groupby(['Export Country', 'Exporter'])['Volume'].sum().reset_index(name='Past Total')
-    exp_radar = pd.merge(exp_past_total, exp_curr_total, on=['Export Country', 'Exporter'], how='outer').fillna(0)
-    
-    exp_radar['Total Decrease'] = exp_radar['Past Total'] - exp_radar['Current Total']
-    exp_radar = exp_radar[exp_radar['Total Decrease'] > 0] 
-
-    if not exp_radar.empty:
-        target_exporters = exp_radar['Exporter'].tolist()
-        exp_detail_df = filtered_df[filtered_df['Exporter'].isin(target_exporters)].copy()
-        exp_detail_df['Export Country'] = exp_detail_df['Export Country'].fillna('Unknown')
-        
-        # 수출국가 포함하여 1:1 디테일 계산
-        exp_curr_detail = exp_detail_df[(exp_detail_df['Date'] >= curr_start) & (exp_detail_df['Date'] <= curr_end)].groupby(['Export Country', 'Exporter', 'Raw Importer Name'])['Volume'].sum().reset_index(name='Current Volume')
-        exp_past_detail = exp_detail_df[(exp_detail_df['Date'] >= past_start) & (exp_detail_df['Date'] <= past_end)].groupby(['Export Country', 'Exporter', 'Raw Importer Name'])['Volume'].sum().reset_index(name='Past Volume')
-        
-        exp_merged = pd.merge(exp_past_detail, exp_curr_detail, on=['Export Country', 'Exporter', 'Raw Importer Name'], how='outer').fillna(0)
-        exp_merged['Volume Change'] = exp_merged['Current Volume'] - exp_merged['Past Volume']
-        
-        def get_exp_trend(row):
-            if row['Past Volume'] == 0 and row['Current Volume'] > 0:
-                return "🆕 신규 거래"
-            elif row['Current Volume'] == 0 and row['Past Volume'] > 0:
-                return "🛑 거래 중단"
-            elif row['Volume Change'] > 0:
-                return "🔼 물량 확대"
-            elif row['Volume Change'] < 0:
-                return "🔽 물량 축소"
+                st.success("조건에 맞는 수입 감소/중단 업체가 없습니다. 대단하네요! 🎉")
+
+
+            # =========================================================================
+            # 🌟 수출사 레이더 (수출사 한국 수출 총량 기준 듀얼 독립 필터링) 🌟
+            # =========================================================================
+            st.markdown("---")
+            st.markdown("#### 🔄 수출사(Exporter) 관점: 한국 시장 이탈 및 환승 현황 (타격이 큰 순서 정렬)")
+
+            if not exp_radar.empty:
+                expanded_exp = paginated_summary(exp_index, "수출사", "exp", radar.format_exporter_index)
+                if len(expanded_exp):
+                    with perf.stage('exporter_detail'):
+                        final_exp_df = radar.cube_exporter_table(
+                            trade_cube, key_ids, expanded_exp['Exporter'].to_numpy(), curr_window, past_window,
+                            target_countries=expanded_exp['Export Country'].to_numpy()
+                        )
+                    with perf.stage('render_exporters'):
+                        st.dataframe(final_exp_df, use_container_width=True)
+                else:
+                    st.caption("👆 수출사 행을 선택하면(또는 '모두 펼치기') 해당 수출사의 한국 수입사별 상세를 계산해 보여줍니다.")
             else:
-                return "➖ 유지 (변동 없음)"
-                
-        exp_merged['Trend'] = exp_merged.apply(get_exp_trend, axis=1)
-
-        final_exp_df = exp_merged.copy()
-        num_cols_exp = ['Past Volume', 'Current Volume', 'Volume Change']
-        final_exp_df[num_cols_exp] = final_exp_df[num_cols_exp].round(2)
-
-        # 🌟 정렬 기준: 1.수출사 전체 타격량 2.국가 3.수출사명 4.한국수입사별 증감
-        exp_total_decrease = final_exp_df.groupby(['Export Country', 'Exporter'])['Volume Change'].sum().reset_index(name='Total Decrease')
-        final_exp_df = final_exp_df.merge(exp_total_decrease, on=['Export Country', 'Exporter'])
-        
-        final_exp_df = final_exp_df.sort_values(by=['Total Decrease', 'Export Country', 'Exporter', 'Volume Change'], ascending=[True, True, True, False])
-
-        final_exp_df = final_exp_df[['Export Country', 'Exporter', 'Trend', 'Raw Importer Name', 'Past Volume', 'Current Volume', 'Volume Change']]
-        final_exp_df.rename(columns={
-            'Export Country': '수출국가',
-            'Exporter': '해외 수출사',
-            'Trend': '세부 추이',
-            'Raw Importer Name': '한국 내 수입사',
-            'Past Volume': '직전 수입량',
-            'Current Volume': '최근 수입량',
-            'Volume Change': '거래량 증감 (+/-)'
-        }, inplace=True)
-
-        # 🌟 MultiIndex: 국가와 수출사를 묶어서 완벽한 계층형 표 생성
-        final_exp_df.set_index(['수출국가', '해외 수출사'], inplace=True)
-
-        st.dataframe(final_exp_df, use_container_width=True)
-    else:
-        st.success("한국으로의 전체 수출량이 감소한 해외 수출사가 없습니다!")
+                st.success("한국으로의 전체 수출량이 감소한 해외 수출사가 없습니다!")
 
-    # =========================================================================
-    # --- 7. 1:1 장기 거래 추이 시각화 ---
-    # =========================================================================
-    st.markdown("---")
-    st.markdown("#### 📈 특정 수입사-수출사 1:1 장기 거래 추이 (전체 기간 마우스 드래그 박스 줌 지원)")
+            # =========================================================================
+            # --- 7. 1:1 장기 거래 추이 시각화 ---
+            # =========================================================================
+            st.markdown("---")
+            st.markdown("#### 📈 특정 수입사-수출사 1:1 장기 거래 추이 (전체 기간 마우스 드래그 박스 줌 지원)")
     
-    col_imp, col_exp = st.columns(2)
-    all_importers = sorted(filtered_df['Raw Importer Name'].dropna().unique().tolist())
-    selected_imp = col_imp.selectbox("🏢 추이를 확인할 '수입사(Importer)' 선택", options=["선택 안함"] + all_importers)
+            col_imp, col_exp = st.columns(2)
+            # 선택 상자 목록·추이·지표는 필터 조합당 한 번 만든 거래선 인덱스에서 바로 읽는다
+            with perf.stage('pair_index'):
+                pair_index = load_pair_index(results.result_key(data_hash, filters, [], [], kind='pairs'), trade_cube, key_ids)
+            selected_imp = col_imp.selectbox("🏢 추이를 확인할 '수입사(Importer)' 선택", options=["선택 안함"] + pair_index.importers)
     
-    if selected_imp != "선택 안함":
-        available_exporters = sorted(filtered_df[filtered_df['Raw Importer Name'] == selected_imp]['Exporter'].dropna().unique().tolist())
-    else:
-        available_exporters = sorted(filtered_df['Exporter'].dropna().unique().tolist())
+            if selected_imp != "선택 안함":
+                available_exporters = pair_index.exporters_of(selected_imp)
+            else:
+                available_exporters = pair_index.exporters
         
-    selected_exp = col_exp.selectbox("🚢 추이를 확인할 '수출사(Exporter)' 선택", options=["선택 안함"] + available_exporters)
+            selected_exp = col_exp.selectbox("🚢 추이를 확인할 '수출사(Exporter)' 선택", options=["선택 안함"] + available_exporters)
     
-    if selected_imp != "선택 안함" and selected_exp != "선택 안함":
-        trend_df = filtered_df[(filtered_df['Raw Importer Name'] == selected_imp) & (filtered_df['Exporter'] == selected_exp)].copy()
+            if selected_imp != "선택 안함" and selected_exp != "선택 안함":
+                monthly_trend = pair_index.trend(selected_imp, selected_exp)
         
-        if not trend_df.empty:
-            trend_df['Month'] = trend_df['Date'].dt.to_period('M').dt.to_timestamp()
-            monthly_trend = trend_df.groupby('Month')['Volume'].sum().reset_index()
+                if not monthly_trend.empty:
+                    total_1to1_volume = monthly_trend['Volume'].sum()
+                    # 거래량이 빈 행은 평균에서 제외 (원본 행의 Volume.mean()과 같은 기준)
+                    avg_per_transaction = total_1to1_volume / monthly_trend['Volume Count'].sum()
             
-            total_1to1_volume = trend_df['Volume'].sum()
-            avg_per_transaction = trend_df['Volume'].mean()
+                    m1, m2, m3 = st.columns([1, 1, 2])
+                    m1.metric("📦 1:1 총 누적 거래량", f"{total_1to1_volume:,.2f} KG")
+                    m2.metric("🧾 1건당 평균 거래량", f"{avg_per_transaction:,.2f} KG")
             
-            m1, m2, m3 = st.columns([1, 1, 2])
-            m1.metric("📦 1:1 총 누적 거래량", f"{total_1to1_volume:,.2f} KG")
-            m2.metric("🧾 1건당 평균 거래량", f"{avg_per_transaction:,.2f} KG")
+                    fig_line = px.line(
+                        monthly_trend, 
+                        x='Month', 
+                        y='Volume',
+                        markers=True,
+                        labels={'Month': '연/월', 'Volume': '수입량 (KG)'}
+                    )
+                    fig_line.update_traces(line_color='#1f77b4', line_width=3, marker_size=8)
+                    fig_line.update_layout(
+                        margin=dict(l=0, r=0, t=20, b=0),
+                        height=350,
+                        dragmode='zoom'
+                    )
+                    st.plotly_chart(fig_line, use_container_width=True)
+
+                    with st.expander("🧾 1:1 원본 거래 내역", expanded=False):
+                        # 이 거래선의 첫 달 ~ 마지막 달 구간만 읽는다 (업로드: 날짜 이진 탐색, 저장소: 해당 월 파티션)
+                        first_month = monthly_trend['Month'].iloc[0]
+                        last_moment = monthly_trend['Month'].iloc[-1] + pd.offsets.MonthBegin(1) - pd.Timedelta(1, 'ns')
+                        with perf.stage('pair_rows'):
+                            pair_filters = {**filters, 'Raw Importer Name': [selected_imp], 'Exporter': [selected_exp]}
+                            if uploaded_file:
+                                pair_rows = trade_data.window(first_month, last_moment, pair_filters)
+                            else:
+                                pair_rows = store.read_partitions(store_dir, first_month, last_moment, pair_filters)
+                        st.dataframe(pair_rows, use_container_width=True)
             
-            fig_line = px.line(
-                monthly_trend, 
-                x='Month', 
-                y='Volume',
-                markers=True,
-                labels={'Month': '연/월', 'Volume': '수입량 (KG)'}
+                else:
+                    st.info("ℹ️ 해당 수입사와 수출사 간의 거래 기록이 없습니다.")
+
+            # 여러 거래선 겹쳐 보기: 후보는 전체 거래량 상위 쌍 + 선택한 수입사의 모든 쌍
+            overlay_options = pair_index.top_pairs(300)
+            if selected_imp != "선택 안함":
+                own_pairs = pair_index.pairs_of(selected_imp)
+                overlay_options = own_pairs + sorted(set(overlay_options) - set(own_pairs), key=overlay_options.index)
+            overlay_pairs = st.multiselect(
+                "📊 여러 거래선 겹쳐 보기 (최대 10개, 거래량 상위 순)", overlay_options,
+                format_func=pair_index.label, max_selections=10, key="overlay_pairs"
             )
-            fig_line.update_traces(line_color='#1f77b4', line_width=3, marker_size=8)
-            fig_line.update_layout(
-                margin=dict(l=0, r=0, t=20, b=0),
-                height=350,
-                dragmode='zoom'
+            if overlay_pairs:
+                with perf.stage('render_overlay'):
+                    fig_overlay = px.line(
+                        pair_index.overlay(overlay_pairs), x='Month', y='Volume', color='Pair', markers=True,
+                        render_mode='webgl', labels={'Month': '연/월', 'Volume': '수입량 (KG)', 'Pair': '거래선'}
+                    )
+                    fig_overlay.update_layout(margin=dict(l=0, r=0, t=20, b=0), height=400, dragmode='zoom')
+                    st.plotly_chart(fig_overlay, use_container_width=True)
+
+        with st.sidebar.expander("🗃️ 결과 캐시 현황", expanded=False):
+            cache_stats = shared_results.stats()
+            st.caption(
+                f"적중 {cache_stats['hits']:,} (디스크 {cache_stats['disk_hits']:,}) · 미스 {cache_stats['misses']:,} · "
+                f"적중률 {cache_stats['hit_rate']:.0%}\n\n"
+                f"{cache_stats['entries']:,}개 조합 · {cache_stats['bytes'] / 2**20:,.1f} / {cache_stats['max_bytes'] / 2**20:,.0f} MB · "
+                f"내보냄 {cache_stats['evictions']:,}"
             )
-            st.plotly_chart(fig_line, use_container_width=True)
-            
-        else:
-            st.info("ℹ️ 해당 수입사와 수출사 간의 거래 기록이 없습니다.")
-else:
-    st.info("👈 좌측 사이드바에서 분석할 데이터를 업로드 해주세요.")
+    else:
+        st.info("👈 좌측 사이드바에서 분석할 데이터를 업로드하거나 저장소 경로를 입력해 주세요.")
+finally:
+    tracer = perf.end()
+    perf.write_log(tracer)
+    profile_path = perf.finish_profile(profiler) if profiler else None
+
+# --- 성능 패널 (정상적으로 끝난 재실행만) ---
+if show_perf:
+    with st.sidebar:
+        st.markdown("---")
+        st.header("⚡ 성능 (이번 재실행)")
+        if tracer.records:
+            perf_df = pd.DataFrame(tracer.records)
+            perf_df['stage'] = ['\u3000' * depth + name.rsplit('/', 1)[-1] for depth, name in zip(perf_df['depth'], perf_df['stage'])]
+            st.dataframe(perf_df.drop(columns=['depth']).set_index('stage'), use_container_width=True)
+        st.caption(f"전체 {tracer.total:,.3f}초 · 로그 {perf.LOG_PATH or '미설정 (TRADE_PERF_LOG)'}")
+        st.download_button("📥 단계 기록 (JSON)", json.dumps(tracer.to_dict(), ensure_ascii=False, indent=2, default=str),
+                           file_name=f"perf-{tracer.started_at:%Y%m%d-%H%M%S}.json", mime="application/json")
+        if profile_path:
+            st.download_button("📥 cProfile (.prof)", profile_path.read_bytes(), file_name=profile_path.name)
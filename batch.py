@@ -0,0 +1,120 @@
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+import cube
+import dataset
+import ingest
+import radar
+import store
+
+# --- 헤드리스 배치 실행 ---
+# Streamlit 없이 HS-CODE x 롤링 기간 조합마다 듀얼 레이더를 돌려 결과 표를 파일로 저장한다.
+# 큐브는 한 번만 만들어 디스크에 두고, 작업 프로세스들은 이를 메모리 맵으로 공유한다.
+#
+#   python batch.py data.csv --out reports --workers 8 --format parquet
+
+PERIOD_SLUGS = {
+    "최근 1개월": "1m",
+    "최근 3개월": "3m",
+    "최근 6개월": "6m",
+    "최근 1년": "1y",
+    "최근 3년": "3y",
+}
+
+_worker_cube = None
+
+
+def _init_worker(cube_path):
+    global _worker_cube
+    _worker_cube = cube.TradeCube.load(cube_path)
+
+
+def _safe_name(value):
+    return re.sub(r'[^0-9A-Za-z가-힣._-]+', '_', str(value))
+
+
+def write_table(table, path, fmt):
+    if fmt == 'xlsx':
+        table.to_excel(path.with_suffix('.xlsx'))
+    else:
+        table.reset_index().to_parquet(path.with_suffix('.parquet'), index=False)
+
+
+def run_task(hs_code, period_option, today, out_dir, fmt):
+    key_ids = _worker_cube.select({'HS-CODE': [hs_code]})
+    curr, past = radar.period_windows(period_option, today)
+    imp_result_df, final_imp_df, exp_radar, final_exp_df = radar.cube_dual_radar(_worker_cube, key_ids, curr, past)
+
+    target = Path(out_dir) / PERIOD_SLUGS[period_option] / _safe_name(hs_code)
+    target.mkdir(parents=True, exist_ok=True)
+    tables = {
+        'importer_summary': radar.decode_entities(imp_result_df, _worker_cube),
+        'importers': final_imp_df,
+        'exporter_summary': radar.decode_entities(exp_radar, _worker_cube),
+        'exporters': final_exp_df,
+    }
+    for name, table in tables.items():
+        if table is not None:
+            write_table(table, target / name, fmt)
+    return hs_code, period_option, len(imp_result_df), len(exp_radar)
+
+
+def prepare_cube(input_path, cache_dir=None):
+    # 반환: (HS-CODE 목록, 데이터 최신 날짜, 큐브 경로)
+    path = Path(input_path)
+    if path.is_dir():
+        # store.py로 스트리밍 수집한 저장소는 큐브가 이미 디스크에 있다
+        trade_cube = store.load_cube(path)
+        return trade_cube.values('HS-CODE'), trade_cube.last_date, path / 'cube'
+
+    df, data_hash = ingest.load_cached(path.read_bytes(), path.name, cache_dir)
+    trade_data = dataset.TradeDataset(df)
+
+    cube_path = (Path(cache_dir) if cache_dir else ingest.CACHE_DIR) / f"{data_hash}.cube"
+    if not (cube_path / 'meta.json').exists():
+        cube.TradeCube.build(trade_data.frame).save(cube_path)
+    return trade_data.options['HS-CODE'], trade_data.last_date, cube_path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Who Stopped Importing? 듀얼 레이더 배치 리포트")
+    parser.add_argument('input', help="원본 데이터 파일 (CSV/Excel) 또는 store.py 저장소 디렉터리")
+    parser.add_argument('--out', default='reports', help="결과 저장 디렉터리")
+    parser.add_argument('--hs-codes', nargs='*', help="대상 HS-CODE (기본: 전체)")
+    parser.add_argument('--periods', nargs='*', choices=list(PERIOD_SLUGS), help="롤링 기간 (기본: 전체)")
+    parser.add_argument('--today', help="기간 계산 기준일 YYYY-MM-DD (기본: 데이터 최신 날짜)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="작업 프로세스 수")
+    parser.add_argument('--format', choices=['parquet', 'xlsx'], default='parquet', help="결과 파일 형식")
+    parser.add_argument('--cache-dir', help="수집 캐시 디렉터리 (기본: TRADE_CACHE_DIR)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    all_codes, last_date, cube_path = prepare_cube(args.input, args.cache_dir)
+
+    if args.hs_codes:
+        by_name = {str(code): code for code in all_codes}
+        hs_codes = [by_name[code] for code in args.hs_codes if code in by_name]
+    else:
+        hs_codes = sorted(all_codes, key=str)
+    periods = args.periods or list(PERIOD_SLUGS)
+    today = pd.Timestamp(args.today) if args.today else last_date
+
+    tasks = [(code, period) for period in periods for code in hs_codes]
+    print(f"{len(tasks)}개 조합 실행 (작업 프로세스 {args.workers}개, 기준일 {today:%Y-%m-%d})")
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(str(cube_path),)) as pool:
+        futures = [pool.submit(run_task, code, period, today, args.out, args.format) for code, period in tasks]
+        for future in as_completed(futures):
+            hs_code, period_option, importers, exporters = future.result()
+            print(f"[{period_option}] HS-CODE {hs_code}: 감소 수입사 {importers}개, 감소 수출사 {exporters}개")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import cube
+import dataset
+import ingest
+import pairs
+import radar
+import store
+
+# --- 성능 벤치마크 ---
+# 실제 통관 데이터처럼 소수 수입사·거래선에 물량이 몰린(편중 분포) 합성 데이터를 만들고,
+# 대시보드가 재실행마다 거치는 단계별 소요 시간을 재어 JSON으로 남긴다.
+#
+#   python benchmark.py --rows 100000 1000000 --output bench.json
+#   python benchmark.py --rows 50000000 --store --data-dir /data/bench    (스트리밍 수집 경로)
+#   python benchmark.py --rows 1000000 --compare bench.json                (이전 실행과 비교)
+
+SIZES = [100_000, 1_000_000, 10_000_000, 50_000_000]
+GENERATE_CHUNK = 1_000_000
+
+DATE_RANGE = ('2019-01-01', '2023-12-31')
+COUNTRIES = ['CN', 'VN', 'US', 'AU', 'IN', 'TH', 'ID', 'BR', 'CA', 'DE', 'JP', 'MY', 'RU', 'UA', 'AR', 'NZ', 'FR', 'ES', 'IT', 'MX']
+HS_CATEGORIES = {
+    1001: 'Cereals', 1005: 'Cereals', 1201: 'Oil Seeds', 1507: 'Vegetable Oils', 1701: 'Sugars',
+    2304: 'Feed', 3901: 'Plastics', 3902: 'Plastics', 4403: 'Wood', 4707: 'Paper',
+    5201: 'Cotton', 7204: 'Steel', 7208: 'Steel', 7403: 'Copper', 7601: 'Aluminium',
+    8703: 'Vehicles', 8471: 'Machinery', 8542: 'Electronics', 2709: 'Energy', 2711: 'Energy',
+}
+PERIOD = "최근 1년"
+
+STAGES = ['load', 'cube', 'filter', 'windows', 'importer_radar', 'exporter_radar', 'price_stats', 'importer_table', 'exporter_table', 'pair_index', 'pair_trend']
+
+
+def zipf_weights(size, exponent):
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate(rows, path, seed=0, chunk=GENERATE_CHUNK):
+    # 거래선(수입사-수출사 쌍)마다 거래 기간을 두어 중단·신규 거래가 생기도록 만든다
+    rng = np.random.default_rng(seed)
+    n_importers = max(100, int(2 * rows ** 0.5))
+    n_exporters = max(100, int(3 * rows ** 0.5))
+    n_pairs = max(500, rows // 40)
+
+    hs_codes = np.array(list(HS_CATEGORIES))
+    categories = np.array([HS_CATEGORIES[code] for code in hs_codes])
+    importers = np.array([f"KOREA IMPORTER {number:06d} CO., LTD." for number in range(n_importers)])
+    exporters = np.array([f"GLOBAL EXPORTER {number:06d} LIMITED" for number in range(n_exporters)])
+    exporter_country = rng.choice(len(COUNTRIES), n_exporters, p=zipf_weights(len(COUNTRIES), 1.0))
+
+    pair_importer = rng.choice(n_importers, n_pairs, p=zipf_weights(n_importers, 1.1))
+    pair_exporter = rng.choice(n_exporters, n_pairs, p=zipf_weights(n_exporters, 1.1))
+    pair_hs = rng.choice(len(hs_codes), n_pairs, p=zipf_weights(len(hs_codes), 0.8))
+    pair_price = rng.lognormal(0.5, 0.8, n_pairs)
+
+    first, last = (np.datetime64(value, 'D').astype(np.int64) for value in DATE_RANGE)
+    span = last - first
+    pair_start = first + rng.integers(0, span, n_pairs)
+    pair_length = np.maximum(30, rng.exponential(span / 2, n_pairs)).astype(np.int64)
+    pair_end = np.minimum(last, pair_start + pair_length)
+    pair_weights = zipf_weights(n_pairs, 1.05)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='') as sink:
+        for offset in range(0, rows, chunk):
+            size = min(chunk, rows - offset)
+            pair = rng.choice(n_pairs, size, p=pair_weights)
+            days = pair_start[pair] + (rng.random(size) * (pair_end[pair] - pair_start[pair] + 1)).astype(np.int64)
+            volume = np.round(rng.lognormal(6.0, 1.2, size), 1)
+            unit_price = np.round(pair_price[pair] * rng.lognormal(0.0, 0.1, size), 4)
+            country = exporter_country[pair_exporter[pair]]
+            origin = np.where(rng.random(size) < 0.85, country, rng.integers(0, len(COUNTRIES), size))
+            exporter = exporters[pair_exporter[pair]].astype(object)
+            exporter[rng.random(size) < 0.01] = None
+
+            frame = pd.DataFrame({
+                'Date': days.astype('datetime64[D]'),
+                'HS-CODE': hs_codes[pair_hs[pair]],
+                'Category': categories[pair_hs[pair]],
+                'Origin Country': np.array(COUNTRIES)[origin],
+                'Export Country': np.array(COUNTRIES)[country],
+                'Exporter': exporter,
+                'Raw Importer Name': importers[pair_importer[pair]],
+                'Volume': volume,
+                'Value': np.round(volume * unit_price, 2),
+                'Unit Price': unit_price,
+            })
+            frame.to_csv(sink, index=False, header=offset == 0, date_format=ingest.DATE_FORMAT)
+    return path
+
+
+@contextmanager
+def timed(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - started, 4)
+
+
+def peak_rss_mb():
+    # Linux 기준 ru_maxrss는 KB 단위. 프로세스 생애 전체의 최댓값이므로 run은 행 수마다 새 프로세스에서 돈다
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run(path, work_dir, streaming=False, period_option=PERIOD):
+    timings = {}
+    work_dir = Path(work_dir)
+
+    if streaming:
+        with timed(timings, 'load'):
+            store.stream_csv(path, work_dir / 'store')
+        with timed(timings, 'cube'):
+            trade_cube = store.load_cube(work_dir / 'store')
+    else:
+        with timed(timings, 'load'):
+            df, _ = ingest.load_cached(Path(path).read_bytes(), Path(path).name, work_dir / 'cache')
+            trade_data = dataset.TradeDataset(df)
+        with timed(timings, 'cube'):
+            trade_cube = cube.TradeCube.build(trade_data.frame)
+
+    # 키 조합이 가장 많은 HS-CODE 하나로 필터 (대시보드의 일반적인 사용)
+    hs_codes = trade_cube.keys['HS-CODE'].to_numpy()
+    hs_code = trade_cube.dictionaries['HS-CODE'][np.bincount(hs_codes[hs_codes >= 0]).argmax()]
+    with timed(timings, 'filter'):
+        key_ids = trade_cube.select({'HS-CODE': [hs_code]})
+        curr, past = radar.period_windows(period_option, trade_cube.last_date)
+    with timed(timings, 'windows'):
+        curr_tot, past_tot = radar.cube_windows(trade_cube, key_ids, curr, past)
+
+    with timed(timings, 'importer_radar'):
+        imp_result_df = radar.cube_importer_radar(curr_tot, past_tot)
+    with timed(timings, 'exporter_radar'):
+        exp_radar = radar.cube_exporter_radar(curr_tot, past_tot)
+
+    target_importers = imp_result_df['Raw Importer Name'].to_numpy()
+    with timed(timings, 'price_stats'):
+        importer_ids = key_ids[np.isin(trade_cube.keys['Raw Importer Name'].to_numpy()[key_ids], target_importers)]
+        radar.line_stats(trade_cube.bucket_totals(importer_ids, 'Y'), radar.IMPORTER_KEYS)
+    with timed(timings, 'importer_table'):
+        final_imp_df = radar.cube_importer_table(trade_cube, key_ids, target_importers, curr, past)
+    with timed(timings, 'exporter_table'):
+        final_exp_df = radar.cube_exporter_table(trade_cube, key_ids, exp_radar['Exporter'].to_numpy(), curr, past)
+
+    # 1:1 추이 화면: 필터 조합당 거래선 인덱스를 만들고, 감소량이 가장 큰 수입사의 첫 거래 수출사 추이를 읽는다
+    with timed(timings, 'pair_index'):
+        pair_index = pairs.PairIndex(trade_cube, key_ids)
+    with timed(timings, 'pair_trend'):
+        if len(imp_result_df):
+            top = imp_result_df.loc[imp_result_df['Volume Decrease'].idxmax(), 'Raw Importer Name']
+            importer = trade_cube.dictionaries['Raw Importer Name'][top]
+            exporters = pair_index.exporters_of(importer)
+            if exporters:
+                pair_index.trend(importer, exporters[0])
+
+    return {
+        'stages': timings,
+        'total': round(sum(timings.values()), 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'result_rows': {'importers': len(final_imp_df), 'exporters': len(final_exp_df)},
+        'cube_keys': len(trade_cube.keys),
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+    }
+
+
+def compare(previous, current):
+    # 같은 행 수·모드의 이전 실행과 단계별 소요 시간 비율 출력 (1.00 초과면 느려짐)
+    earlier = {(entry['rows'], entry['mode']): entry for entry in previous['runs']}
+    for entry in current['runs']:
+        before = earlier.get((entry['rows'], entry['mode']))
+        if before is None:
+            continue
+        print(f"\n{entry['rows']:,}행 ({entry['mode']}) 이전 대비")
+        for stage in STAGES + ['total']:
+            new = entry['total'] if stage == 'total' else entry['stages'].get(stage)
+            old = before['total'] if stage == 'total' else before['stages'].get(stage)
+            if new is not None and old:
+                print(f"  {stage:<16}{old:>10.3f}s -> {new:>10.3f}s  x{new / old:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Who Stopped Importing? 단계별 성능 벤치마크")
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES[:2], help=f"데이터 행 수 (예: {' '.join(map(str, SIZES))})")
+    parser.add_argument('--seed', type=int, default=0, help="합성 데이터 난수 시드")
+    parser.add_argument('--store', action='store_true', help="store.py 스트리밍 수집 경로로 측정")
+    parser.add_argument('--data-dir', help="합성 CSV 보관 경로 (같은 행 수·시드는 재사용, 기본: 임시 경로)")
+    parser.add_argument('--output', default='bench_results.json', help="결과 JSON 경로")
+    parser.add_argument('--compare', help="비교할 이전 결과 JSON")
+    args = parser.parse_args(argv)
+
+    report = {'created': datetime.now().isoformat(timespec='seconds'), 'environment': environment(), 'runs': []}
+    mode = 'store' if args.store else 'memory'
+    with tempfile.TemporaryDirectory() as scratch:
+        data_dir = Path(args.data_dir) if args.data_dir else Path(scratch)
+        for rows in args.rows:
+            path = data_dir / f"synthetic_{rows}_{args.seed}.csv"
+            if not path.exists():
+                started = time.perf_counter()
+                generate(rows, path, args.seed)
+                print(f"{rows:,}행 합성 데이터 생성 {time.perf_counter() - started:.1f}s -> {path}")
+
+            # 행 수마다 forkserver에서 갈라져 나온 새 프로세스에서 측정한다. 최대 RSS가 앞선 크기·데이터 생성의
+            # 메모리를 물려받지 않도록 (spawn은 exec 전 복제된 부모의 RSS가 ru_maxrss에 남는다)
+            with tempfile.TemporaryDirectory(dir=scratch) as work_dir:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('forkserver')) as pool:
+                    result = pool.submit(run, path, work_dir, streaming=args.store).result()
+            report['runs'].append({'rows': rows, 'mode': mode, 'seed': args.seed, **result})
+            stages = ', '.join(f"{name} {seconds:.3f}s" for name, seconds in result['stages'].items())
+            print(f"[{rows:,}행 {mode}] 합계 {result['total']:.3f}s (최대 RSS {result['peak_rss_mb']:,.0f}MB) | {stages}")
+
+    Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"결과 저장 -> {args.output}")
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == '__main__':
+    main()
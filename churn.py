@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+import cube
+import encoding
+import perf
+import radar
+
+# --- 월말 이탈 시계열 ---
+# 지난 N년의 모든 월말을 기준일로 삼아, 롤링 길이마다 수입사 레이더(감소·중단 수입사 수)와
+# 거래선 세부 추이 개수를 한 번에 계산한다. 큐브의 키별 누적합을 월 경계에서 한 번만 읽어
+# 두면 기간 합계는 누적합 두 열의 차라서, 모든 월말 x 기간 길이가 행렬 뺄셈으로 끝난다.
+# 기간은 달력 월 단위: 월말 기준 최근 L개월 vs 바로 직전 L개월.
+
+CHURN_YEARS = 5
+
+# 한 번에 누적합 행렬을 만들 키 수 (수입사 경계에서 끊어 메모리 사용량을 묶어 둔다)
+BLOCK_KEYS = 100_000
+
+WINDOW_MONTHS = {option: length.years * 12 + length.months for option, length in radar.PERIOD_LENGTHS.items()}
+
+COUNT_COLUMNS = ['Decreased Importers', 'Stopped Importers', 'Lost Volume']
+
+
+def month_ends(last_date, years=CHURN_YEARS):
+    # 데이터 최신 날짜까지 다 끝난 달들 (월 Period)
+    last_date = pd.Timestamp(last_date)
+    last_month = last_date.to_period('M')
+    if last_date.normalize() != last_month.to_timestamp(how='end').normalize():
+        last_month -= 1
+    return pd.period_range(end=last_month, periods=years * 12, freq='M')
+
+
+def _line_keys(trade_cube, key_ids):
+    # 수입사 표와 같은 거래선 단위(수입사, 수출국가, 수출사). 이름 없는 수입사는 제외,
+    # 이름 없는 수출사는 'Unknown'으로 묶는다
+    keys = trade_cube.keys.iloc[key_ids]
+    importer = keys['Raw Importer Name'].to_numpy()
+    known = importer != encoding.MISSING
+    key_ids, keys = key_ids[known], keys[known]
+
+    unknown = encoding.code_of(trade_cube.dictionaries['Exporter'], 'Unknown')
+    exporter = keys['Exporter'].to_numpy()
+    lines = pd.DataFrame({
+        'Raw Importer Name': keys['Raw Importer Name'].to_numpy(),
+        'Export Country': keys['Export Country'].to_numpy(),
+        'Exporter': np.where(exporter == encoding.MISSING, unknown, exporter),
+    })
+    # sort=True라 거래선 번호는 수입사 순서를 따른다 -> 키를 거래선 번호로 정렬하면 수입사별로 연속
+    line_ids = lines.groupby(radar.IMPORTER_KEYS, sort=True).ngroup().to_numpy()
+    order = np.argsort(line_ids, kind='stable')
+    return key_ids[order], line_ids[order], lines['Raw Importer Name'].to_numpy()[order]
+
+
+def _starts(values):
+    return np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+
+
+def _blocks(importers, block_keys):
+    # 수입사 경계에서만 자른 [시작, 끝) 키 구간
+    if len(importers) == 0:
+        return []
+    starts = _starts(importers)
+    cuts = starts[np.r_[True, np.diff(starts // block_keys) > 0]]
+    return zip(cuts, np.r_[cuts[1:], len(importers)])
+
+
+def _windows(cumulative, ends, months):
+    curr = cumulative[:, ends] - cumulative[:, ends - months]
+    past = cumulative[:, ends - months] - cumulative[:, ends - 2 * months]
+    return curr.round(cube.TOTAL_DECIMALS), past.round(cube.TOTAL_DECIMALS)
+
+
+def churn_series(trade_cube, key_ids, ends, windows=WINDOW_MONTHS, block_keys=BLOCK_KEYS):
+    # 반환: (기간, 월말)마다 감소/중단 수입사 수, 증발 물량, 감소 수입사 거래선의 추이별 개수
+    longest = max(windows.values())
+    edges = pd.period_range(ends[0] - 2 * longest + 1, ends[-1] + 1, freq='M').to_timestamp()
+    # 월말 i의 (배타적) 끝 경계 = edges[2 * longest + i]
+    end_index = 2 * longest + np.arange(len(ends))
+
+    counts = {option: np.zeros((len(COUNT_COLUMNS), len(ends))) for option in windows}
+    trends = {option: np.zeros((len(radar.TRENDS), len(ends)), dtype=np.int64) for option in windows}
+
+    with perf.stage('churn_keys'):
+        sorted_ids, line_ids, importers = _line_keys(trade_cube, np.asarray(key_ids))
+
+    for lo, hi in _blocks(importers, block_keys):
+        with perf.stage('churn_cumulative'):
+            block_ids = sorted_ids[lo:hi]
+            line_starts = _starts(line_ids[lo:hi])
+            volume = np.add.reduceat(trade_cube.cumulative(edges, block_ids, 'Volume'), line_starts, axis=0)
+            rows = np.add.reduceat(trade_cube.cumulative(edges, block_ids, 'Rows'), line_starts, axis=0)
+            line_importer = importers[lo:hi][line_starts]
+            importer_starts = _starts(line_importer)
+            importer_volume = np.add.reduceat(volume, importer_starts, axis=0)
+            # 거래선 -> 블록 안 수입사 순번
+            owner = np.cumsum(np.r_[False, line_importer[1:] != line_importer[:-1]])
+
+        with perf.stage('churn_windows'):
+            for option, months in windows.items():
+                curr, past = _windows(importer_volume, end_index, months)
+                decreased = (past - curr) > 0
+                counts[option][0] += decreased.sum(axis=0)
+                counts[option][1] += (decreased & (curr == 0)).sum(axis=0)
+                counts[option][2] += np.where(decreased, past - curr, 0.0).sum(axis=0)
+
+                # 세부 추이는 그 월말에 감소로 잡힌 수입사의, 두 기간 중 거래가 있는 거래선만
+                line_curr, line_past = _windows(volume, end_index, months)
+                rows_curr, rows_past = _windows(rows, end_index, months)
+                shown = decreased[owner] & ((rows_curr + rows_past) > 0)
+                codes = radar.trend_codes(line_past, line_curr)
+                for number in range(len(radar.TRENDS)):
+                    trends[option][number] += ((codes == number) & shown).sum(axis=0)
+
+    frames = []
+    for option in windows:
+        frame = pd.DataFrame(counts[option].T, columns=COUNT_COLUMNS)
+        frame[radar.TRENDS] = trends[option].T
+        frame.insert(0, 'Month End', ends.to_timestamp(how='end').normalize())
+        frame.insert(0, 'Window', option)
+        frames.append(frame)
+    churn_df = pd.concat(frames, ignore_index=True)
+    churn_df[COUNT_COLUMNS[:2]] = churn_df[COUNT_COLUMNS[:2]].astype(np.int64)
+    churn_df['Lost Volume'] = churn_df['Lost Volume'].round(2)
+    return churn_df
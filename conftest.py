@@ -0,0 +1 @@
+# 테스트에서 최상위 모듈(radar, cube ...)을 그대로 import 하도록 저장소 루트를 경로에 둔다
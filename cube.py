@@ -0,0 +1,295 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import encoding
+import ingest
+
+# --- 일자별 거래 큐브 ---
+# (수입사, 수출국가, 수출사, HS-CODE, Category, 원산지) 조합마다 일(또는 월) 단위
+# 합계를 한 번만 만들어 두고, 날짜 축 누적합(prefix sum)으로 기간 합계를
+# 뺄셈 한 번에 구한다.
+
+CUBE_KEYS = ['Raw Importer Name', 'Export Country', 'Exporter', 'HS-CODE', 'Category', 'Origin Country']
+# Rows는 거래 건수, Volume Count는 거래량이 비어 있지 않은 건수 (평균 거래량의 분모)
+MEASURES = ['Volume', 'Value', 'Rows', 'Volume Count', 'Price Sum', 'Price Count']
+
+# 누적합 뺄셈에서 생기는 부동소수 오차가 증감 판정(> 0, == 0)에 섞이지 않도록 반올림
+TOTAL_DECIMALS = 6
+
+
+def period_code(dates, freq):
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    if freq == 'M':
+        return np.asarray(dates.year * 12 + dates.month - 1, dtype=np.int64)
+    return dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def period_start(codes, freq):
+    codes = np.asarray(codes, dtype=np.int64)
+    if freq == 'M':
+        return pd.to_datetime({'year': codes // 12, 'month': codes % 12 + 1, 'day': 1})
+    return pd.Series(codes.astype('datetime64[D]').astype('datetime64[ns]'))
+
+
+def aggregate(df, freq='D'):
+    # 원본 거래 행 -> (키, 기간)별 합계. 스트리밍 수집에서도 청크 단위로 재사용한다.
+    # 날짜가 비었거나 읽을 수 없는 행(NaT)은 어느 기간에도 속하지 않으므로 제외한다
+    df = df[df['Date'].notna()]
+    frame = df[CUBE_KEYS + ['Volume', 'Value', 'Unit Price']].assign(Period=period_code(df['Date'], freq))
+    if isinstance(frame['Export Country'].dtype, pd.CategoricalDtype) and 'Unknown' not in frame['Export Country'].cat.categories:
+        frame['Export Country'] = frame['Export Country'].cat.add_categories('Unknown')
+    frame['Export Country'] = frame['Export Country'].fillna('Unknown')
+
+    return frame.groupby(CUBE_KEYS + ['Period'], observed=True, dropna=False, sort=True).agg(**{
+        'Volume': ('Volume', 'sum'),
+        'Value': ('Value', 'sum'),
+        'Rows': ('Volume', 'size'),
+        'Volume Count': ('Volume', 'count'),
+        'Price Sum': ('Unit Price', 'sum'),
+        'Price Count': ('Unit Price', 'count'),
+    })
+
+
+def encode_keys(keys):
+    # 키 컬럼을 int32 코드로. 레이더가 'Unknown'으로 채우는 컬럼은 사전에 미리 넣어 둔다
+    coded, dictionaries = {}, {}
+    for column in CUBE_KEYS:
+        codes, dictionary = encoding.encode(keys[column])
+        if column in ingest.UNKNOWN_FILL_COLUMNS:
+            dictionary = encoding.ensure(dictionary, 'Unknown')
+        coded[column], dictionaries[column] = codes, dictionary
+    return pd.DataFrame(coded), dictionaries
+
+
+class TradeCube:
+    def __init__(self, keys, dictionaries, composite, key_start, prefix, freq, min_code, span):
+        # keys: 키 컬럼별 int32 코드 표, dictionaries: 컬럼별 코드 -> 이름 사전
+        self.keys = keys
+        self.dictionaries = dictionaries
+        self.freq = freq
+        self.min_code = min_code
+        self.span = span
+        self._composite = composite
+        self._key_start = key_start
+        self._prefix = prefix
+        self._ranks = {}
+
+    @classmethod
+    def from_aggregated(cls, aggregated, freq='D'):
+        index = aggregated.index
+
+        # (키, 기간) 정렬 상태에서 키가 바뀌는 지점으로 키 번호를 매긴다
+        changed = np.zeros(len(index), dtype=bool)
+        if len(index):
+            changed[0] = True
+        for level_codes in index.codes[:-1]:
+            level_codes = np.asarray(level_codes)
+            changed[1:] |= level_codes[1:] != level_codes[:-1]
+        row_keys = np.cumsum(changed) - 1
+
+        keys, dictionaries = encode_keys(index[changed].droplevel(-1).to_frame(index=False))
+        periods = index.get_level_values(-1).to_numpy(dtype=np.int64)
+        min_code = int(periods.min()) if len(periods) else 0
+        span = int(periods.max()) - min_code + 1 if len(periods) else 1
+        composite = row_keys.astype(np.int64) * span + (periods - min_code)
+
+        # 키마다 누적합을 새로 시작해 큰 값끼리의 뺄셈으로 정밀도가 깎이지 않게 한다
+        prefix = {}
+        for measure in MEASURES:
+            values = aggregated[measure].to_numpy(dtype=np.float64)
+            prefix[measure] = pd.Series(values).groupby(row_keys).cumsum().to_numpy()
+        return cls(keys, dictionaries, composite, np.flatnonzero(changed), prefix, freq, min_code, span)
+
+    @classmethod
+    def build(cls, df, freq='D'):
+        return cls.from_aggregated(aggregate(df, freq), freq)
+
+    def merge(self, aggregated, dictionaries):
+        # 추가분 (키, 기간) 합계를 건드린 키의 구간에만 끼워 넣은 새 큐브를 만든다.
+        # aggregated의 키 카테고리는 dictionaries(이 큐브 사전을 뒤로만 늘린 것)라서 카테고리
+        # 코드가 곧 큐브 코드다. 이름으로 되돌리거나 전체 칸을 다시 묶어 정렬하지 않고,
+        # 키마다 추가분의 가장 이른 기간부터 끝까지(보통 마지막 몇 칸)만 누적합을 다시 계산한다.
+        if aggregated.empty:
+            return self
+        delta = aggregated.reset_index()
+        delta_keys = pd.DataFrame({column: delta[column].cat.codes.to_numpy(dtype=np.int32) for column in CUBE_KEYS})
+        periods = delta['Period'].to_numpy(dtype=np.int64)
+
+        # 추가분 칸 -> 키 번호 (처음 보는 키는 뒤에 새 번호)
+        key_ids = pd.MultiIndex.from_frame(self.keys).get_indexer(pd.MultiIndex.from_frame(delta_keys))
+        keys = self.keys
+        if (key_ids < 0).any():
+            fresh = delta_keys[key_ids < 0].drop_duplicates(ignore_index=True)
+            fresh_ids = pd.MultiIndex.from_frame(fresh).get_indexer(pd.MultiIndex.from_frame(delta_keys[key_ids < 0]))
+            key_ids[key_ids < 0] = len(keys) + fresh_ids
+            keys = pd.concat([keys, fresh], ignore_index=True)
+
+        old_count, cell_count = len(self.keys), len(self._composite)
+        old_start = np.r_[self._key_start, np.full(len(keys) - old_count, cell_count)].astype(np.int64)
+        old_end = np.r_[old_start[1:], cell_count]
+        min_code = min(self.min_code, int(periods.min()))
+        span = max(self.min_code + self.span, int(periods.max()) + 1) - min_code
+
+        # 키별 다시 계산할 꼬리 [cut, end): 추가분의 가장 이른 기간 이후 칸. 그 앞 칸은 누적합이 그대로다
+        earliest = pd.Series(periods).groupby(key_ids).min()
+        touched_ids = earliest.index.to_numpy()
+        cut = old_end.copy()
+        existing_ids = touched_ids[touched_ids < old_count]
+        offsets = np.clip(earliest.to_numpy()[touched_ids < old_count] - self.min_code, 0, self.span)
+        cut[existing_ids] = np.searchsorted(self._composite, existing_ids * self.span + offsets)
+
+        lengths = (old_end - cut)[existing_ids]
+        cells = np.repeat(cut[existing_ids] - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+        first = cells == np.repeat(old_start[existing_ids], lengths)
+        tail = {'Key': np.repeat(existing_ids, lengths), 'Period': self._composite[cells] % self.span + self.min_code}
+        base = {}
+        for measure in MEASURES:
+            prefix = self._prefix[measure]
+            tail[measure] = np.where(first, prefix[cells], prefix[cells] - prefix[np.maximum(cells - 1, 0)]).round(TOTAL_DECIMALS)
+            base[measure] = np.zeros(len(keys))
+            base[measure][existing_ids] = np.where(cut[existing_ids] > old_start[existing_ids], prefix[np.maximum(cut[existing_ids] - 1, 0)], 0.0)
+        added = pd.DataFrame({'Key': key_ids, 'Period': periods, **{measure: delta[measure].to_numpy(dtype=np.float64) for measure in MEASURES}})
+        spliced = pd.concat([pd.DataFrame(tail), added], ignore_index=True) \
+            .groupby(['Key', 'Period'], sort=True)[MEASURES].sum().reset_index()
+        spliced_keys = spliced['Key'].to_numpy()
+
+        # 새 배치: 키 구간 길이 = 그대로 둔 앞부분 + 다시 만든 꼬리
+        head = cut - old_start
+        key_start = np.r_[0, np.cumsum(head + np.bincount(spliced_keys, minlength=len(keys)))[:-1]].astype(np.int64)
+        total = int(head.sum() + len(spliced))
+        composite = np.empty(total, dtype=np.int64)
+        prefix = {measure: np.empty(total, dtype=np.float64) for measure in MEASURES}
+
+        # 그대로 둔 칸은 키 구간이 밀린 만큼만 옮긴다 (기간 범위가 넓어지면 합성 코드만 다시 계산)
+        cell_keys = np.repeat(np.arange(old_count), (old_end - old_start)[:old_count])
+        kept = np.flatnonzero(np.arange(cell_count) < cut[cell_keys])
+        kept_keys = cell_keys[kept]
+        target = kept + (key_start - old_start)[kept_keys]
+        composite[target] = kept_keys * span + (self._composite[kept] % self.span + self.min_code - min_code)
+        for measure in MEASURES:
+            prefix[measure][target] = self._prefix[measure][kept]
+
+        grouped = spliced.groupby('Key', sort=False)
+        target = key_start[spliced_keys] + head[spliced_keys] + grouped.cumcount().to_numpy()
+        composite[target] = spliced_keys * span + (spliced['Period'].to_numpy() - min_code)
+        for measure in MEASURES:
+            prefix[measure][target] = grouped[measure].cumsum().to_numpy() + base[measure][spliced_keys]
+
+        return TradeCube(keys, {column: dictionaries[column] for column in CUBE_KEYS}, composite, key_start,
+                         prefix, self.freq, min_code, span)
+
+    def save(self, path):
+        # 디렉터리 하나에 키 표 / 누적합 열 / 메타 정보를 Arrow IPC로 저장
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        ingest.write_arrow(self.keys.assign(**{'Key Start': self._key_start}), path / 'keys.arrow')
+        ingest.write_arrow(pd.DataFrame({'Composite': self._composite, **self._prefix}), path / 'rows.arrow')
+        dictionaries = {column: dictionary.tolist() for column, dictionary in self.dictionaries.items()}
+        (path / 'dictionaries.json').write_text(json.dumps(dictionaries, ensure_ascii=False))
+        meta = {'freq': self.freq, 'min_code': self.min_code, 'span': self.span}
+        (path / 'meta.json').write_text(json.dumps(meta))
+
+    @classmethod
+    def load(cls, path):
+        # 누적합 열은 메모리 맵 그대로 사용하므로 여러 프로세스가 같은 페이지를 공유한다
+        path = Path(path)
+        meta = json.loads((path / 'meta.json').read_text())
+        keys = ingest.read_arrow(path / 'keys.arrow')
+        key_start = keys.pop('Key Start').to_numpy()
+        dictionaries = {
+            column: pd.Index(values, dtype=object)
+            for column, values in json.loads((path / 'dictionaries.json').read_text()).items()
+        }
+        with pa.memory_map(str(path / 'rows.arrow'), 'r') as source:
+            rows = pa.ipc.open_file(source).read_all().combine_chunks()
+        prefix = {measure: rows.column(measure).to_numpy() for measure in MEASURES}
+        return cls(keys, dictionaries, rows.column('Composite').to_numpy(), key_start, prefix,
+                   meta['freq'], meta['min_code'], meta['span'])
+
+    @property
+    def first_date(self):
+        return period_start([self.min_code], self.freq).iloc[0]
+
+    @property
+    def last_date(self):
+        return period_start([self.min_code + self.span - 1], self.freq).iloc[0]
+
+    def decoded(self, key_ids):
+        # 키 코드를 이름(카테고리)으로 되돌린 표 (화면·병합용)
+        codes = self.keys.iloc[key_ids]
+        return pd.DataFrame({
+            column: encoding.decode(codes[column].to_numpy(), self.dictionaries[column])
+            for column in CUBE_KEYS
+        })
+
+    def rank(self, column):
+        # 코드 -> 이름 사전순 순위 (컬럼별로 한 번만 계산)
+        if column not in self._ranks:
+            self._ranks[column] = encoding.lexical_rank(self.dictionaries[column])
+        return self._ranks[column]
+
+    def values(self, column, key_ids=None):
+        # 선택된 키에 실제로 나타나는 이름 목록
+        codes = self.keys[column].to_numpy() if key_ids is None else self.keys[column].to_numpy()[key_ids]
+        codes = np.unique(codes[codes != encoding.MISSING])
+        return self.dictionaries[column][codes].tolist()
+
+    def select(self, filters=None):
+        # 필터 값이 비어 있으면 해당 컬럼은 전체 선택
+        mask = np.ones(len(self.keys), dtype=bool)
+        for column, values in (filters or {}).items():
+            if values:
+                codes = encoding.codes_of(self.dictionaries[column], values)
+                mask &= np.isin(self.keys[column].to_numpy(), codes)
+        return np.flatnonzero(mask)
+
+    def _positions(self, key_ids, codes):
+        offsets = np.clip(np.asarray(codes, dtype=np.int64) - self.min_code, 0, self.span)
+        targets = key_ids[:, None].astype(np.int64) * self.span + offsets[None, :]
+        return np.searchsorted(self._composite, targets.ravel(), side='left').reshape(targets.shape)
+
+    def _frame(self, key_ids, lo, hi):
+        frame = self.keys.iloc[key_ids].reset_index(drop=True)
+        start = self._key_start[key_ids]
+        for measure in MEASURES:
+            prefix = self._prefix[measure]
+            upper = np.where(hi > start, prefix[hi - 1], 0.0)
+            lower = np.where(lo > start, prefix[lo - 1], 0.0)
+            frame[measure] = (upper - lower).round(TOTAL_DECIMALS)
+        return frame
+
+    def cumulative(self, dates, key_ids=None, measure='Volume'):
+        # 키별 누적합 C(t): 각 날짜 직전까지의 합계 (행: 키, 열: 날짜). 구간 합계는 두 열의 차
+        if key_ids is None:
+            key_ids = np.arange(len(self.keys))
+        key_ids = np.asarray(key_ids)
+        positions = self._positions(key_ids, period_code(dates, self.freq))
+        start = self._key_start[key_ids][:, None]
+        return np.where(positions > start, self._prefix[measure][positions - 1], 0.0)
+
+    def totals(self, start, end, key_ids=None):
+        # [start, end] 구간 합계. 거래가 없는 키는 제외한다.
+        if key_ids is None:
+            key_ids = np.arange(len(self.keys))
+        codes = period_code([start, end], self.freq)
+        positions = self._positions(np.asarray(key_ids), [codes[0], codes[1] + 1])
+        frame = self._frame(key_ids, positions[:, 0], positions[:, 1])
+        return frame[frame['Rows'] > 0].reset_index(drop=True)
+
+    def bucket_totals(self, key_ids=None, freq='Y'):
+        # 전체 기간을 연('Y') 또는 월('M') 단위로 나눈 키별 합계 (long 형식)
+        if key_ids is None:
+            key_ids = np.arange(len(self.keys))
+        key_ids = np.asarray(key_ids)
+        periods = pd.period_range(self.first_date, self.last_date, freq=freq)
+        edges = periods.append(pd.PeriodIndex([periods[-1] + 1])).to_timestamp()
+
+        positions = self._positions(key_ids, period_code(edges, self.freq))
+        lo, hi = positions[:, :-1].ravel(), positions[:, 1:].ravel()
+        frame = self._frame(np.repeat(key_ids, len(edges) - 1), lo, hi)
+        frame['Period'] = np.tile(edges[:-1].to_numpy(), len(key_ids))
+        return frame[frame['Rows'] > 0].reset_index(drop=True)
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# --- 날짜 정렬 데이터셋 ---
+# 로드한 거래 데이터를 Date 기준으로 한 번만 정렬해 두고, 기간은 이진 탐색
+# (searchsorted)으로 잘라낸 슬라이스로 읽는다. 기간 비교 집계는 큐브가 맡고,
+# 여기서는 필터 선택지와 원본 행 조회(1:1 원본 거래 내역)만 담당한다.
+
+FILTER_COLUMNS = ['HS-CODE', 'Category', 'Origin Country']
+
+
+class TradeDataset:
+    def __init__(self, df, filter_columns=FILTER_COLUMNS):
+        if not df['Date'].is_monotonic_increasing:
+            df = df.sort_values('Date', kind='stable', ignore_index=True)
+        self.frame = df
+        self.dates = df['Date'].to_numpy()
+        # 날짜가 빈 행(NaT)은 정렬 시 맨 뒤로 가므로 앞쪽 dated개만 유효한 날짜다
+        self.dated = int(np.count_nonzero(~np.isnat(self.dates)))
+        self.options = {
+            column: df[column].dropna().unique().tolist()
+            for column in filter_columns if column in df.columns
+        }
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def first_date(self):
+        return pd.Timestamp(self.dates[0])
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.dates[self.dated - 1]) if self.dated else pd.NaT
+
+    def bounds(self, start, end):
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), side='right')
+        return lo, hi
+
+    def window(self, start, end, filters=None):
+        # [start, end] 구간은 복사 없는 연속 슬라이스, 필터(컬럼 -> 값 목록)는 그 구간 안에서만 비교
+        lo, hi = self.bounds(start, end)
+        frame = self.frame.iloc[lo:hi]
+        mask = np.ones(len(frame), dtype=bool)
+        for column, values in (filters or {}).items():
+            if values:
+                mask &= frame[column].isin(values).to_numpy()
+        return frame if mask.all() else frame[mask]
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+# --- 엔티티 정수 코드 ---
+# 수입사/수출사/국가 같은 긴 문자열 컬럼을 int32 코드로 바꿔 두고, 집계·병합·정렬은
+# 코드로 하며 이름은 화면에 그릴 때만 사전(lookup table)으로 되돌린다.
+# 사전은 뒤에만 값을 덧붙이므로(append-only) 한 번 부여된 코드는 바뀌지 않는다.
+
+MISSING = -1
+
+
+def encode(series, dictionary=None):
+    # 반환: (int32 코드 배열, 사전). 결측값은 MISSING
+    if dictionary is None:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            dictionary = pd.Index(series.cat.categories, dtype=object)
+        else:
+            dictionary = pd.Index(pd.unique(series.dropna()), dtype=object)
+    codes = pd.Categorical(series, categories=dictionary).codes
+    return codes.astype(np.int32), dictionary
+
+
+def ensure(dictionary, value):
+    if value in dictionary:
+        return dictionary
+    return dictionary.append(pd.Index([value], dtype=object))
+
+
+def code_of(dictionary, value):
+    return int(dictionary.get_indexer([value])[0])
+
+
+def codes_of(dictionary, values):
+    codes = dictionary.get_indexer(list(values))
+    return codes[codes >= 0].astype(np.int32)
+
+
+def decode(codes, dictionary):
+    return pd.Categorical.from_codes(np.asarray(codes, dtype=np.int32), categories=dictionary)
+
+
+def lexical_rank(dictionary):
+    # 코드 -> 이름 사전순 순위 (코드 그대로 정렬해도 이름순과 같아지도록)
+    order = np.argsort(dictionary.astype(str).to_numpy(), kind='stable')
+    rank = np.empty(len(dictionary), dtype=np.int32)
+    rank[order] = np.arange(len(dictionary), dtype=np.int32)
+    return rank
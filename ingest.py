@@ -0,0 +1,88 @@
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+# --- 컬럼형 수집 캐시 ---
+# 업로드 원본을 내용 해시 기준으로 한 번만 파싱해 Arrow IPC 파일로 저장하고,
+# 이후에는 메모리 맵으로 바로 읽어 들인다.
+
+CACHE_DIR = Path(os.environ.get("TRADE_CACHE_DIR", ".trade_cache"))
+
+DATE_FORMAT = "%Y-%m-%d"
+
+CATEGORY_COLUMNS = ['Raw Importer Name', 'Exporter', 'Export Country', 'HS-CODE', 'Category', 'Origin Country']
+
+# 레이더에서 결측값을 'Unknown'으로 채우는 컬럼 (카테고리에 미리 등록)
+UNKNOWN_FILL_COLUMNS = ['Exporter', 'Export Country']
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def parse_dates(values):
+    try:
+        return pd.to_datetime(values, format=DATE_FORMAT)
+    except (ValueError, TypeError):
+        # 형식이 다른 파일(시간 포함 등)은 기존처럼 자동 추론으로 처리
+        return pd.to_datetime(values)
+
+
+def normalize(df):
+    df['Date'] = parse_dates(df['Date'])
+    # 기간 조회가 이진 탐색으로 끝나도록 저장 전에 한 번만 날짜순 정렬
+    df = df.sort_values('Date', kind='stable', ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column in UNKNOWN_FILL_COLUMNS:
+        if column in df.columns and 'Unknown' not in df[column].cat.categories:
+            categories = sorted(df[column].cat.categories.tolist() + ['Unknown'])
+            df[column] = df[column].cat.set_categories(categories)
+    return df
+
+
+def read_raw(data, name):
+    buffer = io.BytesIO(data)
+    if name.endswith('.csv'):
+        return pd.read_csv(buffer)
+    return pd.read_excel(buffer)
+
+
+def write_arrow(df, path):
+    # 쓰는 쪽마다 고유한 임시 파일에 다 쓴 뒤 한 번에 교체 (같은 파일을 동시에 수집해도 서로 덮지 않음)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    path = Path(path)
+    descriptor, tmp_name = tempfile.mkstemp(prefix='.tmp-', suffix=path.suffix, dir=path.parent)
+    os.close(descriptor)
+    try:
+        with pa.OSFile(tmp_name, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def read_arrow(path):
+    with pa.memory_map(str(path), 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def load_cached(data, name, cache_dir=None):
+    cache_dir = Path(cache_dir) if cache_dir else CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    digest = content_hash(data)
+    path = cache_dir / f"{digest}.arrow"
+
+    if not path.exists():
+        df = normalize(read_raw(data, name))
+        write_arrow(df, path)
+    return read_arrow(path), digest
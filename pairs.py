@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+import encoding
+import perf
+
+# --- 1:1 거래선 인덱스 ---
+# 필터 조합마다 한 번만 (수입사, 수출사) 쌍을 이름순으로 정렬해 두고, 쌍마다 월별 거래량
+# 시계열을 CSR 형태(쌍별 시작 위치 + 월/거래량/건수 배열)로 붙여 둔다. 선택 상자 목록과
+# 1:1 추이 차트·지표는 재실행마다 키를 훑지 않고 이 인덱스를 슬라이스해서 읽는다.
+
+# 월별 합계를 만들 때 한 번에 처리할 키 수 (키 x 월 위치 행렬의 메모리 상한)
+BLOCK_KEYS = 100_000
+
+
+class PairIndex:
+    def __init__(self, trade_cube, key_ids, block_keys=BLOCK_KEYS):
+        key_ids = np.asarray(key_ids)
+        keys = trade_cube.keys.iloc[key_ids]
+        importer = keys['Raw Importer Name'].to_numpy()
+        exporter = keys['Exporter'].to_numpy()
+        known = (importer != encoding.MISSING) & (exporter != encoding.MISSING)
+        key_ids, importer, exporter = key_ids[known], importer[known], exporter[known]
+
+        # 쌍 번호 순서 = (수입사명, 수출사명) 사전순
+        pairs = pd.DataFrame({'importer': importer, 'exporter': exporter}).drop_duplicates()
+        order = np.lexsort((
+            trade_cube.rank('Exporter')[pairs['exporter'].to_numpy()],
+            trade_cube.rank('Raw Importer Name')[pairs['importer'].to_numpy()],
+        ))
+        pair_importer = pairs['importer'].to_numpy()[order]
+        pair_exporter = pairs['exporter'].to_numpy()[order]
+        self._pairs = pd.Series(np.arange(len(order)), index=pd.MultiIndex.from_arrays([pair_importer, pair_exporter]))
+
+        importer_names = trade_cube.dictionaries['Raw Importer Name']
+        exporter_names = trade_cube.dictionaries['Exporter']
+        self._importer_codes = pd.Series(np.arange(len(importer_names)), index=importer_names)
+        self._exporter_codes = pd.Series(np.arange(len(exporter_names)), index=exporter_names)
+        self.pair_importers = importer_names[pair_importer].tolist()
+        self.pair_exporters = exporter_names[pair_exporter].tolist()
+
+        # 수입사 -> 그 수입사의 쌍 구간 [lo, hi) (쌍이 수입사명 순이라 연속)
+        starts = np.flatnonzero(np.r_[True, pair_importer[1:] != pair_importer[:-1]]) if len(order) else np.empty(0, dtype=np.intp)
+        self.importers = [self.pair_importers[start] for start in starts]
+        self._importer_slices = dict(zip(self.importers, zip(starts.tolist(), np.r_[starts[1:], len(order)].tolist())))
+        self.exporters = sorted(set(self.pair_exporters))
+
+        self._build_series(trade_cube, key_ids, block_keys)
+
+    def _build_series(self, trade_cube, key_ids, block_keys):
+        # 키별 월 합계 -> 쌍별 월 합계 (쌍 번호, 월 순으로 정렬된 long 배열 + 쌍별 시작 위치)
+        with perf.stage('pair_series'):
+            frames = [pd.DataFrame({'Pair': pd.Series([], dtype=np.int64), 'Month': pd.to_datetime([]), 'Volume': [], 'Rows': [], 'Volume Count': []})]
+            for lo in range(0, len(key_ids), block_keys):
+                monthly = trade_cube.bucket_totals(key_ids[lo:lo + block_keys], 'M')
+                codes = pd.MultiIndex.from_arrays([monthly['Raw Importer Name'], monthly['Exporter']])
+                frames.append(pd.DataFrame({
+                    'Pair': self._pairs.reindex(codes).to_numpy(),
+                    'Month': monthly['Period'].to_numpy(),
+                    'Volume': monthly['Volume'].to_numpy(),
+                    'Rows': monthly['Rows'].to_numpy(),
+                    'Volume Count': monthly['Volume Count'].to_numpy(),
+                }))
+            series = pd.concat(frames, ignore_index=True).groupby(['Pair', 'Month'], sort=True)[['Volume', 'Rows', 'Volume Count']].sum().reset_index()
+
+        pair = series['Pair'].to_numpy()
+        self._month = series['Month'].to_numpy()
+        self._volume = series['Volume'].to_numpy()
+        self._rows = series['Rows'].to_numpy()
+        self._volume_count = series['Volume Count'].to_numpy()
+        self._offsets = np.searchsorted(pair, np.arange(len(self._pairs) + 1))
+        self.totals = np.bincount(pair, weights=self._volume, minlength=len(self._pairs))
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def exporters_of(self, importer):
+        lo, hi = self._importer_slices.get(importer, (0, 0))
+        return self.pair_exporters[lo:hi]
+
+    def pair_of(self, importer, exporter):
+        if importer not in self._importer_codes.index or exporter not in self._exporter_codes.index:
+            return None
+        return self._pairs.get((self._importer_codes[importer], self._exporter_codes[exporter]))
+
+    def trend(self, importer, exporter):
+        # 월별 거래량/건수 (거래가 있는 달만). 없는 쌍이면 빈 표
+        return self.trend_of(self.pair_of(importer, exporter))
+
+    def trend_of(self, pair):
+        lo, hi = (0, 0) if pair is None else (self._offsets[pair], self._offsets[pair + 1])
+        return pd.DataFrame({
+            'Month': self._month[lo:hi],
+            'Volume': self._volume[lo:hi],
+            'Rows': self._rows[lo:hi],
+            'Volume Count': self._volume_count[lo:hi],
+        })
+
+    def label(self, pair):
+        return f"{self.pair_importers[pair]} ⇄ {self.pair_exporters[pair]}"
+
+    def overlay(self, pair_ids):
+        # 여러 쌍의 월별 시계열을 한 표로 (Pair 컬럼 = 표시 이름)
+        frames = [self.trend_of(pair).assign(Pair=self.label(pair)) for pair in pair_ids]
+        return pd.concat(frames, ignore_index=True) if frames else self.trend_of(None).assign(Pair=[])
+
+    def top_pairs(self, limit):
+        # 전체 기간 거래량이 큰 순서의 쌍 번호
+        return np.argsort(-self.totals, kind='stable')[:limit].tolist()
+
+    def pairs_of(self, importer):
+        lo, hi = self._importer_slices.get(importer, (0, 0))
+        return list(range(lo, hi))
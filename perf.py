@@ -0,0 +1,159 @@
+import contextvars
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import ingest
+
+# --- 단계별 성능 계측 ---
+# 재실행 한 번을 Tracer 하나로 기록한다. 코드 곳곳의 `with perf.stage("이름"):` 블록은
+# 활성 Tracer가 있을 때만 소요 시간(과 선택 시 최대 메모리)을 남기고, 없으면 아무 일도
+# 하지 않으므로 배치·벤치마크에서도 그대로 호출해도 된다.
+#
+#   TRADE_PERF_LOG       재실행마다 단계 기록을 JSON 한 줄씩 덧붙일 파일
+#   TRADE_PROFILE_DIR    재실행 cProfile 결과(.prof) 저장 디렉터리 (기본: 수집 캐시/profiles)
+
+LOG_PATH = os.environ.get("TRADE_PERF_LOG") or None
+PROFILE_DIR = os.environ.get("TRADE_PROFILE_DIR") or None
+
+MB = 1 << 20
+
+_current = contextvars.ContextVar('perf_tracer', default=None)
+
+# tracemalloc은 프로세스 전역이라, 메모리를 재는 Tracer 수를 세어 마지막 하나가 끝날 때만 끈다
+# (이미 다른 도구가 켜 둔 추적은 건드리지 않는다)
+_memory_lock = threading.Lock()
+_memory_users = 0
+_memory_started = False
+
+
+def _acquire_memory():
+    global _memory_users, _memory_started
+    with _memory_lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_started = True
+        _memory_users += 1
+
+
+def _release_memory():
+    global _memory_users, _memory_started
+    with _memory_lock:
+        _memory_users -= 1
+        if _memory_users == 0 and _memory_started:
+            tracemalloc.stop()
+            _memory_started = False
+
+
+class Tracer:
+    def __init__(self, trace_memory=False):
+        # tracemalloc은 프로세스 전역이라 동시에 도는 다른 세션의 할당도 함께 잡힐 수 있다
+        self.trace_memory = trace_memory
+        self.context = {}
+        self.started_at = datetime.now()
+        self.records = []
+        self._stack = []
+        self.total = None
+        self._started = time.perf_counter()
+        if trace_memory:
+            _acquire_memory()
+
+    @contextmanager
+    def stage(self, name):
+        frame = {'name': name, 'depth': len(self._stack)}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in self._stack:
+                outer['peak'] = max(outer['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['start'] = frame['peak'] = current
+        # 기록은 시작 순서로 쌓아 두고(상위 단계가 하위보다 먼저) 끝날 때 값을 채운다
+        record = {'stage': '/'.join([outer['name'] for outer in self._stack] + [name]), 'depth': frame['depth']}
+        self.records.append(record)
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['seconds'] = round(time.perf_counter() - started, 6)
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                frame['peak'] = max(frame['peak'], peak)
+                record['peak_mb'] = round((frame['peak'] - frame['start']) / MB, 3)
+                record['retained_mb'] = round((current - frame['start']) / MB, 3)
+            self._stack.pop()
+            if self._stack and self.trace_memory:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], frame['peak'])
+
+    def finish(self):
+        # 중단된 재실행의 정리(finally)에서 다시 불려도 한 번만 반납한다
+        if self.total is None:
+            self.total = round(time.perf_counter() - self._started, 6)
+            if self.trace_memory:
+                _release_memory()
+        return self
+
+    def to_dict(self):
+        return {
+            'run_at': self.started_at.isoformat(timespec='seconds'),
+            'context': self.context,
+            'total_seconds': self.total,
+            'stages': self.records,
+        }
+
+
+@contextmanager
+def stage(name):
+    tracer = _current.get()
+    if tracer is None:
+        yield
+        return
+    with tracer.stage(name):
+        yield
+
+
+def begin(trace_memory=False):
+    tracer = Tracer(trace_memory)
+    _current.set(tracer)
+    return tracer
+
+
+def end():
+    tracer = _current.get()
+    _current.set(None)
+    return tracer.finish() if tracer is not None else None
+
+
+def write_log(tracer, path=LOG_PATH):
+    # 구조화 로그: 재실행 하나 = JSON 한 줄 (운영 세션 기록 보관용)
+    if not path:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as sink:
+        sink.write(json.dumps(tracer.to_dict(), ensure_ascii=False, default=str) + '\n')
+
+
+def start_profile():
+    # 다른 세션이 프로파일 중이면(Python 3.12+는 프로세스당 하나) 이번 재실행은 건너뛴다
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+def finish_profile(profiler, directory=PROFILE_DIR):
+    # 재실행마다 .prof 파일 하나 (snakeviz / pstats로 확인)
+    profiler.disable()
+    directory = Path(directory) if directory else ingest.CACHE_DIR / 'profiles'
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}.prof"
+    profiler.dump_stats(str(path))
+    return path
@@ -0,0 +1,353 @@
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+import encoding
+import perf
+
+# --- 듀얼 레이더 연산 엔진 ---
+# Streamlit 화면과 분리된 수입사/수출사 레이더 계산. 행 단위 apply 없이
+# 벡터 연산과 한 번의 그룹 집계로 표를 만든다.
+
+TREND_NEW = "🆕 신규 거래"
+TREND_STOPPED = "🛑 거래 중단"
+TREND_UP = "🔼 물량 확대"
+TREND_DOWN = "🔽 물량 축소"
+TREND_FLAT = "➖ 유지 (변동 없음)"
+TRENDS = [TREND_NEW, TREND_STOPPED, TREND_UP, TREND_DOWN, TREND_FLAT]
+
+# 롤링 비교 기간: 최근 N 기간 vs 바로 직전 N 기간
+PERIOD_LENGTHS = {
+    "최근 1개월": relativedelta(months=1),
+    "최근 3개월": relativedelta(months=3),
+    "최근 6개월": relativedelta(months=6),
+    "최근 1년": relativedelta(years=1),
+    "최근 3년": relativedelta(years=3),
+}
+
+IMPORTER_KEYS = ['Raw Importer Name', 'Export Country', 'Exporter']
+EXPORTER_KEYS = ['Export Country', 'Exporter', 'Raw Importer Name']
+
+IMPORTER_COLUMNS = {
+    'Raw Importer Name': '수입업체명',
+    'Exporter Line': '거래 수출업체',
+    'Past Volume': '직전 수입량',
+    'Current Volume': '최근 수입량',
+    'Volume Change': '거래량 증감 (+/-)',
+    'Avg Volume': '과거 평균 수량',
+    'Arithmetic Avg Price': '산술단가 ($)',
+    'Weighted Avg Price': '가중단가 ($)'
+}
+
+# 상세 표 페이지 목록(수입사/수출사 단위 요약)에만 있는 컬럼
+INDEX_COLUMNS = {
+    'Total Decrease': '전체 증감 (+/-)',
+    'Lines': '거래선 수',
+}
+
+EXPORTER_COLUMNS = {
+    'Export Country': '수출국가',
+    'Exporter': '해외 수출사',
+    'Trend': '세부 추이',
+    'Raw Importer Name': '한국 내 수입사',
+    'Past Volume': '직전 수입량',
+    'Current Volume': '최근 수입량',
+    'Volume Change': '거래량 증감 (+/-)'
+}
+
+
+def trend_codes(past, current):
+    # TRENDS 안의 위치 번호. 문자열 없이 추이별 개수만 셀 때 사용
+    past = np.asarray(past)
+    current = np.asarray(current)
+    change = current - past
+    conditions = [
+        (past == 0) & (current > 0),
+        (current == 0) & (past > 0),
+        change > 0,
+        change < 0,
+    ]
+    return np.select(conditions, [0, 1, 2, 3], default=4)
+
+
+def classify_trend(past, current):
+    return np.array(TRENDS)[trend_codes(past, current)]
+
+
+def period_windows(period_option, today):
+    length = PERIOD_LENGTHS[period_option]
+    curr_end = today
+    curr_start = curr_end - length + relativedelta(days=1)
+    past_end = curr_start - relativedelta(days=1)
+    past_start = past_end - length + relativedelta(days=1)
+    return (pd.to_datetime(curr_start), pd.to_datetime(curr_end)), (pd.to_datetime(past_start), pd.to_datetime(past_end))
+
+
+def fill_unknown(series):
+    if isinstance(series.dtype, pd.CategoricalDtype) and 'Unknown' not in series.cat.categories:
+        series = series.cat.add_categories('Unknown')
+    return series.fillna('Unknown')
+
+
+def compare_volumes(past_df, curr_df, keys, past_name='Past Volume', curr_name='Current Volume'):
+    past_vol = past_df.groupby(keys, observed=True)['Volume'].sum().reset_index(name=past_name)
+    curr_vol = curr_df.groupby(keys, observed=True)['Volume'].sum().reset_index(name=curr_name)
+    return pd.merge(past_vol, curr_vol, on=keys, how='outer').fillna({past_name: 0, curr_name: 0})
+
+
+def line_stats(yearly, keys):
+    # 연도별 합계 한 번으로 과거 평균 수량과 산술/가중 단가를 동시에 계산
+    yearly = yearly.groupby(keys + ['Period'], observed=True)[['Volume', 'Value', 'Price Sum', 'Price Count']].sum()
+    stats = yearly.groupby(level=keys, observed=True).agg(**{
+        'Avg Volume': ('Volume', 'mean'),
+        'Volume': ('Volume', 'sum'),
+        'Value': ('Value', 'sum'),
+        'Price Sum': ('Price Sum', 'sum'),
+        'Price Count': ('Price Count', 'sum'),
+    })
+    volume = stats['Volume'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weighted = np.where(volume > 0, stats['Value'].to_numpy() / volume, 0.0)
+        arithmetic = stats['Price Sum'].to_numpy() / stats['Price Count'].to_numpy()
+    return pd.DataFrame({
+        'Avg Volume': stats['Avg Volume'].to_numpy(),
+        'Arithmetic Avg Price': arithmetic,
+        'Weighted Avg Price': weighted,
+    }, index=stats.index).reset_index()
+
+
+def importer_radar(curr_df, past_df):
+    imp_result_df = compare_volumes(past_df, curr_df, ['Raw Importer Name'])
+    imp_result_df['Volume Decrease'] = imp_result_df['Past Volume'] - imp_result_df['Current Volume']
+    imp_result_df = imp_result_df[imp_result_df['Volume Decrease'] > 0].copy()
+    imp_result_df['Is Stopped'] = imp_result_df['Current Volume'] == 0
+    return imp_result_df
+
+
+def _names(series, trade_cube=None):
+    # 코드 컬럼이면 큐브 사전으로 이름을 되돌리고, 이름 컬럼이면 그대로 문자열화
+    if trade_cube is None:
+        return series.astype(str)
+    names = encoding.decode(series.to_numpy(), trade_cube.dictionaries[series.name])
+    return pd.Series(names, index=series.index, name=series.name).astype(str)
+
+
+def _sort_key(series, trade_cube=None):
+    # 이름순 정렬 키: 코드 컬럼은 사전순 순위(정수)로 비교한다
+    if trade_cube is None:
+        return series.astype(str)
+    return trade_cube.rank(series.name)[series.to_numpy()]
+
+
+def format_importer_table(merged, trade_cube=None):
+    final_imp_df = merged.copy()
+    final_imp_df['Volume Change'] = final_imp_df['Current Volume'] - final_imp_df['Past Volume']
+    final_imp_df['세부 추이'] = classify_trend(final_imp_df['Past Volume'], final_imp_df['Current Volume'])
+
+    num_cols_imp = ['Current Volume', 'Past Volume', 'Volume Change', 'Avg Volume', 'Arithmetic Avg Price', 'Weighted Avg Price']
+    final_imp_df[num_cols_imp] = final_imp_df[num_cols_imp].round(2)
+
+    # 거래선 표시명은 고유한 (국가, 수출사) 쌍마다 한 번만 만든다
+    final_imp_df['Total Decrease'] = final_imp_df.groupby('Raw Importer Name', observed=True)['Volume Change'].transform('sum')
+    lines = final_imp_df[['Export Country', 'Exporter']].drop_duplicates()
+    lines['Exporter Line'] = "[" + _names(lines['Export Country'], trade_cube) + "] " + _names(lines['Exporter'], trade_cube)
+    final_imp_df = final_imp_df.merge(lines, on=['Export Country', 'Exporter'], how='left')
+
+    # 정렬 기준: 1.수입사 전체 증감 2.수입사명 3.거래선별 증감 (동률은 거래선명 순)
+    final_imp_df['Importer Order'] = _sort_key(final_imp_df['Raw Importer Name'], trade_cube)
+    final_imp_df = final_imp_df.sort_values(
+        by=['Total Decrease', 'Importer Order', 'Volume Change', 'Exporter Line'],
+        ascending=[True, True, False, True]
+    )
+    final_imp_df['Raw Importer Name'] = _names(final_imp_df['Raw Importer Name'], trade_cube)
+
+    final_imp_df = final_imp_df[['Raw Importer Name', '세부 추이', 'Exporter Line', 'Past Volume', 'Current Volume', 'Volume Change', 'Avg Volume', 'Arithmetic Avg Price', 'Weighted Avg Price']]
+    final_imp_df = final_imp_df.rename(columns=IMPORTER_COLUMNS)
+    return final_imp_df.set_index(['수입업체명'])
+
+
+def exporter_radar(curr_df, past_df):
+    curr_df = curr_df.assign(**{'Export Country': fill_unknown(curr_df['Export Country'])})
+    past_df = past_df.assign(**{'Export Country': fill_unknown(past_df['Export Country'])})
+
+    exp_radar = compare_volumes(past_df, curr_df, ['Export Country', 'Exporter'], 'Past Total', 'Current Total')
+    exp_radar['Total Decrease'] = exp_radar['Past Total'] - exp_radar['Current Total']
+    return exp_radar[exp_radar['Total Decrease'] > 0].copy()
+
+
+def format_exporter_table(merged, trade_cube=None):
+    final_exp_df = merged.copy()
+    final_exp_df['Volume Change'] = final_exp_df['Current Volume'] - final_exp_df['Past Volume']
+    final_exp_df['Trend'] = classify_trend(final_exp_df['Past Volume'], final_exp_df['Current Volume'])
+
+    num_cols_exp = ['Past Volume', 'Current Volume', 'Volume Change']
+    final_exp_df[num_cols_exp] = final_exp_df[num_cols_exp].round(2)
+
+    # 정렬 기준: 1.수출사 전체 타격량 2.국가 3.수출사명 4.한국수입사별 증감
+    final_exp_df['Total Decrease'] = final_exp_df.groupby(['Export Country', 'Exporter'], observed=True)['Volume Change'].transform('sum')
+    order = {f'{column} Order': _sort_key(final_exp_df[column], trade_cube) for column in EXPORTER_KEYS}
+    final_exp_df = final_exp_df.assign(**order).sort_values(
+        by=['Total Decrease', 'Export Country Order', 'Exporter Order', 'Volume Change', 'Raw Importer Name Order'],
+        ascending=[True, True, True, False, True]
+    )
+    for column in EXPORTER_KEYS:
+        final_exp_df[column] = _names(final_exp_df[column], trade_cube)
+
+    final_exp_df = final_exp_df[['Export Country', 'Exporter', 'Trend', 'Raw Importer Name', 'Past Volume', 'Current Volume', 'Volume Change']]
+    final_exp_df = final_exp_df.rename(columns=EXPORTER_COLUMNS)
+    return final_exp_df.set_index(['수출국가', '해외 수출사'])
+
+
+# --- 큐브 기반 조회 ---
+# 원본 행 대신 TradeCube의 기간 합계(키 단위)를 같은 연산에 넣는다. 키 컬럼은 int32
+# 코드 그대로 묶고·병합하고·정렬하며, 이름은 결과 표를 만들 때만 되돌린다.
+
+def _known(frame, columns):
+    # 이름이 없는(MISSING) 코드 행 제외: 이름 표에서 groupby가 결측을 버리는 것과 같다
+    return frame[(frame[columns] != encoding.MISSING).all(axis=1)]
+
+
+def decode_entities(frame, trade_cube):
+    frame = frame.copy()
+    for column in frame.columns.intersection(list(trade_cube.dictionaries)):
+        frame[column] = _names(frame[column], trade_cube)
+    return frame
+
+
+def cube_windows(trade_cube, key_ids, curr, past):
+    return trade_cube.totals(*curr, key_ids), trade_cube.totals(*past, key_ids)
+
+
+def cube_importer_radar(curr_tot, past_tot):
+    return importer_radar(_known(curr_tot, ['Raw Importer Name']), _known(past_tot, ['Raw Importer Name']))
+
+
+def cube_exporter_radar(curr_tot, past_tot):
+    return exporter_radar(_known(curr_tot, ['Exporter']), _known(past_tot, ['Exporter']))
+
+
+def cube_importer_table(trade_cube, key_ids, target_importers, curr, past):
+    with perf.stage('windows'):
+        key_ids = key_ids[np.isin(trade_cube.keys['Raw Importer Name'].to_numpy()[key_ids], target_importers)]
+        curr_tot, past_tot = cube_windows(trade_cube, key_ids, curr, past)
+    with perf.stage('price_stats'):
+        yearly = trade_cube.bucket_totals(key_ids, 'Y')
+        unknown = encoding.code_of(trade_cube.dictionaries['Exporter'], 'Unknown')
+        for frame in (curr_tot, past_tot, yearly):
+            frame['Exporter'] = frame['Exporter'].where(frame['Exporter'] != encoding.MISSING, unknown)
+        stats = line_stats(yearly, IMPORTER_KEYS)
+
+    with perf.stage('merge'):
+        merged = compare_volumes(past_tot, curr_tot, IMPORTER_KEYS)
+        merged = merged.merge(stats, on=IMPORTER_KEYS, how='left')
+    with perf.stage('format'):
+        return format_importer_table(merged, trade_cube)
+
+
+def cube_exporter_table(trade_cube, key_ids, target_exporters, curr, past, target_countries=None):
+    # target_countries를 주면 (수출국가, 수출사) 쌍 단위로 거른다 (페이지별 상세)
+    with perf.stage('windows'):
+        exporters = trade_cube.keys['Exporter'].to_numpy()[key_ids]
+        if target_countries is None:
+            key_ids = key_ids[np.isin(exporters, target_exporters)]
+        else:
+            countries = trade_cube.keys['Export Country'].to_numpy()[key_ids]
+            key_ids = key_ids[np.isin(_pair_codes(countries, exporters), _pair_codes(target_countries, target_exporters))]
+        curr_tot, past_tot = cube_windows(trade_cube, key_ids, curr, past)
+
+    with perf.stage('merge'):
+        merged = compare_volumes(_known(past_tot, ['Raw Importer Name']), _known(curr_tot, ['Raw Importer Name']), EXPORTER_KEYS)
+    with perf.stage('format'):
+        return format_exporter_table(merged, trade_cube)
+
+
+def _pair_codes(countries, exporters):
+    return np.asarray(countries, dtype=np.int64) << 32 | (np.asarray(exporters, dtype=np.int64) & 0xFFFFFFFF)
+
+
+def _with_unknown_exporter(trade_cube, frame):
+    unknown = encoding.code_of(trade_cube.dictionaries['Exporter'], 'Unknown')
+    return frame.assign(Exporter=frame['Exporter'].where(frame['Exporter'] != encoding.MISSING, unknown))
+
+
+def _line_index(merged, group_keys):
+    # 상세 표와 같은 방식(거래선 증감을 소수 둘째 자리로 반올림한 뒤 합산)의 그룹별 전체 증감
+    merged['Volume Change'] = (merged['Current Volume'] - merged['Past Volume']).round(2)
+    return merged.groupby(group_keys, observed=True).agg(**{
+        'Past Volume': ('Past Volume', 'sum'),
+        'Current Volume': ('Current Volume', 'sum'),
+        'Total Decrease': ('Volume Change', 'sum'),
+        'Lines': ('Volume Change', 'size'),
+    }).reset_index()
+
+
+def cube_importer_index(trade_cube, curr_tot, past_tot, target_importers):
+    # 수입사 표의 정렬 순서(전체 증감 -> 수입사명)대로 나열한 수입사 목록. 거래선 상세 없이
+    # 기간 합계만으로 계산하므로, 상세는 화면에 보이는 페이지의 수입사만 따로 만들면 된다
+    frames = [
+        _with_unknown_exporter(trade_cube, frame[np.isin(frame['Raw Importer Name'], target_importers)])
+        for frame in (curr_tot, past_tot)
+    ]
+    index = _line_index(compare_volumes(frames[1], frames[0], IMPORTER_KEYS), ['Raw Importer Name'])
+    index['Importer Order'] = _sort_key(index['Raw Importer Name'], trade_cube)
+    index = index.sort_values(['Total Decrease', 'Importer Order'])
+    return index.drop(columns=['Importer Order']).reset_index(drop=True)
+
+
+def cube_exporter_index(trade_cube, curr_tot, past_tot, target_exporters):
+    # 수출사 표의 정렬 순서(전체 증감 -> 국가 -> 수출사명)대로 나열한 (국가, 수출사) 목록
+    frames = [
+        _known(frame[np.isin(frame['Exporter'], target_exporters)], ['Raw Importer Name'])
+        for frame in (curr_tot, past_tot)
+    ]
+    index = _line_index(compare_volumes(frames[1], frames[0], EXPORTER_KEYS), ['Export Country', 'Exporter'])
+    order = {f'{column} Order': _sort_key(index[column], trade_cube) for column in ['Export Country', 'Exporter']}
+    index = index.assign(**order).sort_values(['Total Decrease', 'Export Country Order', 'Exporter Order'])
+    return index.drop(columns=list(order)).reset_index(drop=True)
+
+
+def format_importer_index(page, trade_cube):
+    # 페이지 목록 표시용: 이름 복원, 반올림, 한글 컬럼명
+    page = decode_entities(page, trade_cube).round(2).rename(columns={**IMPORTER_COLUMNS, **INDEX_COLUMNS})
+    return page.set_index(['수입업체명'])
+
+
+def format_exporter_index(page, trade_cube):
+    page = decode_entities(page, trade_cube).round(2).rename(columns={**EXPORTER_COLUMNS, **INDEX_COLUMNS})
+    return page.set_index(['수출국가', '해외 수출사'])
+
+
+def cube_radar_overview(trade_cube, key_ids, curr, past):
+    # 화면용: 요약 표와 상세 표의 수입사/수출사 순서까지만 계산한다.
+    # 거래선 상세는 보이는 페이지(또는 펼친 업체)만 cube_importer_table / cube_exporter_table로
+    with perf.stage('windows'):
+        curr_tot, past_tot = cube_windows(trade_cube, key_ids, curr, past)
+    with perf.stage('importer_radar'):
+        imp_result_df = cube_importer_radar(curr_tot, past_tot)
+    with perf.stage('exporter_radar'):
+        exp_radar = cube_exporter_radar(curr_tot, past_tot)
+    with perf.stage('importer_index'):
+        imp_index = cube_importer_index(trade_cube, curr_tot, past_tot, imp_result_df['Raw Importer Name'].to_numpy())
+    with perf.stage('exporter_index'):
+        exp_index = cube_exporter_index(trade_cube, curr_tot, past_tot, exp_radar['Exporter'].to_numpy())
+    return imp_result_df, imp_index, exp_radar, exp_index
+
+
+def cube_dual_radar(trade_cube, key_ids, curr, past):
+    # 화면 없이 수입사/수출사 레이더 표를 한 번에 계산 (배치 실행용)
+    with perf.stage('windows'):
+        curr_tot, past_tot = cube_windows(trade_cube, key_ids, curr, past)
+    with perf.stage('importer_radar'):
+        imp_result_df = cube_importer_radar(curr_tot, past_tot)
+    with perf.stage('exporter_radar'):
+        exp_radar = cube_exporter_radar(curr_tot, past_tot)
+
+    final_imp_df = final_exp_df = None
+    if not imp_result_df.empty:
+        with perf.stage('importer_table'):
+            final_imp_df = cube_importer_table(trade_cube, key_ids, imp_result_df['Raw Importer Name'].to_numpy(), curr, past)
+    if not exp_radar.empty:
+        with perf.stage('exporter_table'):
+            final_exp_df = cube_exporter_table(trade_cube, key_ids, exp_radar['Exporter'].to_numpy(), curr, past)
+    return imp_result_df, final_imp_df, exp_radar, final_exp_df
+
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+# --- 레이더 결과 공유 캐시 ---
+# 같은 데이터·필터·기간 조합의 레이더 표를 프로세스 전체(모든 세션)에서 재사용한다.
+# 메모리 한도를 넘으면 가장 오래 쓰지 않은 조합부터 내보내고(LRU), 디스크 계층을
+# 켜면 표를 Arrow 파일로 남겨 재시작 후에도 이어 쓴다.
+#
+#   TRADE_RESULT_CACHE_MB    메모리 한도 (기본 256MB)
+#   TRADE_RESULT_CACHE_DIR   디스크 계층 경로 (비우면 메모리만 사용)
+#   TRADE_RESULT_DISK_MB     디스크 한도 (기본 2048MB)
+
+MEMORY_BUDGET = int(os.environ.get("TRADE_RESULT_CACHE_MB", "256")) << 20
+DISK_DIR = os.environ.get("TRADE_RESULT_CACHE_DIR") or None
+DISK_BUDGET = int(os.environ.get("TRADE_RESULT_DISK_MB", "2048")) << 20
+
+# 쓰는 중인 항목의 임시 디렉터리 접두사 (정리·조회 대상에서 제외)
+TMP_PREFIX = '.tmp-'
+
+# 결과 종류별 표 형식 버전: 캐시에 담는 표의 구성이 바뀌면 올려서 예전 형식 항목(디스크 포함)을 미스로 만든다
+#   radar 2: 상세 표 대신 수입사/수출사 인덱스를 담는다 (페이지 단위 상세 조회)
+FORMAT_VERSIONS = {'radar': 2, 'churn': 1, 'pairs': 1}
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(data_hash, filters, curr, past, kind='radar'):
+    # 필터 값 선택 순서가 달라도 같은 조합이면 같은 키
+    parts = {
+        'kind': kind,
+        'version': FORMAT_VERSIONS[kind],
+        'data': data_hash,
+        'filters': {column: sorted(map(str, values)) for column, values in filters.items() if values},
+        'curr': [pd.Timestamp(value).isoformat() for value in curr],
+        'past': [pd.Timestamp(value).isoformat() for value in past],
+    }
+    encoded = json.dumps(parts, ensure_ascii=False, sort_keys=True).encode()
+    return hashlib.blake2b(encoded, digest_size=20).hexdigest()
+
+
+def tables_size(tables):
+    return int(sum(table.memory_usage(index=True, deep=True).sum() for table in tables if table is not None))
+
+
+def write_tables(tables, path):
+    # 표마다 Arrow 파일 하나, meta.json은 마지막에 써서 완성된 항목만 읽히게 한다.
+    # 쓰는 쪽마다 고유한 임시 디렉터리를 쓰고, 같은 키를 다른 세션이 먼저 옮겨 놓았으면 그쪽을 둔다
+    tmp_path = Path(tempfile.mkdtemp(prefix=TMP_PREFIX, dir=path.parent))
+    try:
+        present = []
+        for number, table in enumerate(tables):
+            if table is None:
+                continue
+            arrow_table = pa.Table.from_pandas(table)
+            with pa.OSFile(str(tmp_path / f"{number}.arrow"), 'wb') as sink:
+                with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                    writer.write_table(arrow_table)
+            present.append(number)
+        (tmp_path / 'meta.json').write_text(json.dumps({'count': len(tables), 'present': present}))
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            if not (path / 'meta.json').exists():
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def read_tables(path):
+    meta = json.loads((path / 'meta.json').read_text())
+    tables = [None] * meta['count']
+    for number in meta['present']:
+        with pa.memory_map(str(path / f"{number}.arrow"), 'r') as source:
+            tables[number] = pa.ipc.open_file(source).read_all().to_pandas()
+    return tuple(tables)
+
+
+def _dir_size(path):
+    return sum(item.stat().st_size for item in path.iterdir())
+
+
+class ResultCache:
+    # 저장된 표는 세션끼리 공유하므로 호출하는 쪽에서 수정하지 않는다 (필요하면 copy)
+
+    def __init__(self, max_bytes=MEMORY_BUDGET, disk_dir=DISK_DIR, disk_bytes=DISK_BUDGET):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_bytes = disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        path = self.disk_dir / key if self.disk_dir else None
+        if path is not None and (path / 'meta.json').exists():
+            try:
+                tables = read_tables(path)
+                os.utime(path)
+            except OSError as error:
+                # 다른 세션이 방금 정리한 항목 등: 디스크 계층은 최선 노력이므로 미스로 처리
+                logger.warning("결과 캐시 디스크 읽기 실패 (%s): %s", key, error)
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, tables)
+                return tables
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, tables):
+        tables = tuple(tables)
+        self._remember(key, tables)
+        if self.disk_dir:
+            # 디스크 쓰기 실패는 화면까지 올리지 않는다 (메모리 계층의 결과는 그대로 반환)
+            try:
+                write_tables(tables, self.disk_dir / key)
+                self._trim_disk()
+            except OSError as error:
+                logger.warning("결과 캐시 디스크 쓰기 실패 (%s): %s", key, error)
+        return tables
+
+    def get_or_compute(self, key, compute):
+        tables = self.get(key)
+        if tables is None:
+            tables = self.put(key, compute())
+        return tables
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remember(self, key, tables):
+        size = tables_size(tables)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # 한도보다 큰 결과는 메모리에 두지 않는다 (디스크 계층만 사용)
+                return
+            self._entries[key] = (tables, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def _trim_disk(self):
+        # 디스크 계층도 마지막 사용 시각(mtime) 기준으로 오래된 항목부터 정리
+        entries = [
+            path for path in self.disk_dir.iterdir()
+            if not path.name.startswith(TMP_PREFIX) and (path / 'meta.json').exists()
+        ]
+        sizes = {path: _dir_size(path) for path in entries}
+        total = sum(sizes.values())
+        for path in sorted(entries, key=lambda item: item.stat().st_mtime):
+            if total <= self.disk_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
@@ -0,0 +1,301 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import cube
+import ingest
+
+# --- 대용량 스트리밍 저장소 ---
+# 메모리에 다 올라가지 않는 CSV를 청크 단위로 읽어, 원본 행은 연/월 파티션
+# Parquet으로 흘려 보내고 레이더에 필요한 큐브 집계만 누적한다.
+#
+#   store/
+#     rows/Year=YYYY/Month=M/*.parquet   원본 거래 행 (1:1 드릴다운용)
+#     cube/                               TradeCube (keys / rows / meta)
+#     manifest.json                       원본 해시, 행 수, 집계 단위
+#
+#   python store.py big.csv store_dir --chunksize 500000
+#   python store.py delta.csv store_dir --append        (월간 추가분 증분 반영)
+
+CHUNK_SIZE = 500_000
+
+# 증분 추가 시 이미 수집된 행과 같은 거래로 볼 기준 컬럼 (Date 포함 시 해당 월 파티션만 비교)
+DEDUP_KEY = ['Date', 'Raw Importer Name', 'Export Country', 'Exporter', 'HS-CODE', 'Volume', 'Value']
+
+# 청크마다(파일마다) 정수/실수로 추론이 갈리지 않도록 실수로 고정하는 측정 컬럼
+MEASURE_COLUMNS = ['Volume', 'Value']
+
+# 청크별 부분 집계가 이 행 수를 넘으면 하나로 합쳐 메모리 사용량을 묶어 둔다
+MAX_PARTIAL_ROWS = 5_000_000
+
+
+def file_hash(path, block_size=8 << 20):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_hash(source):
+    if hasattr(source, 'getvalue'):
+        return ingest.content_hash(source.getvalue())
+    return file_hash(source)
+
+
+def is_store(store_dir):
+    return (Path(store_dir) / 'manifest.json').is_file()
+
+
+def read_manifest(store_dir):
+    return json.loads((Path(store_dir) / 'manifest.json').read_text())
+
+
+def write_manifest(store_dir, manifest):
+    # 임시 파일에 쓴 뒤 바꿔 끼워, 읽는 쪽이 반쯤 쓰인 매니페스트를 보지 않게 한다
+    path = Path(store_dir) / 'manifest.json'
+    tmp_path = path.with_name(f".tmp-{os.getpid()}-{path.name}")
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    os.replace(tmp_path, path)
+
+
+def new_dictionaries():
+    return {
+        column: pd.Index(['Unknown'] if column in ingest.UNKNOWN_FILL_COLUMNS else [], dtype=object)
+        for column in ingest.CATEGORY_COLUMNS
+    }
+
+
+def encode_chunk(chunk, dictionaries):
+    # 청크가 바뀌어도 같은 값은 같은 코드가 되도록 누적 사전으로 카테고리화
+    for column, known in dictionaries.items():
+        values = pd.Index(chunk[column].dropna().unique(), dtype=object)
+        dictionaries[column] = known.append(values.difference(known))
+        chunk[column] = pd.Categorical(chunk[column], categories=dictionaries[column])
+    return chunk
+
+
+def merge_aggregates(partials, dictionaries):
+    frames = []
+    for partial in partials:
+        frame = partial.reset_index()
+        for column, categories in dictionaries.items():
+            frame[column] = frame[column].cat.set_categories(categories)
+        frames.append(frame)
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.groupby(cube.CUBE_KEYS + ['Period'], observed=True, dropna=False, sort=True)[cube.MEASURES].sum()
+
+
+def write_partitions(chunk, rows_dir, tag):
+    partitioned = chunk.assign(Year=chunk['Date'].dt.year, Month=chunk['Date'].dt.month)
+    table = pa.Table.from_pandas(partitioned, preserve_index=False)
+    pq.write_to_dataset(table, rows_dir, partition_cols=['Year', 'Month'],
+                        basename_template=f"part-{tag}-{{i}}.parquet")
+
+
+def read_csv_chunks(path, chunksize=CHUNK_SIZE):
+    # 키 컬럼은 청크마다 추론 타입이 달라지지 않도록 문자열로, 측정 컬럼은 실수로 고정
+    dtype = {column: str for column in ingest.CATEGORY_COLUMNS}
+    dtype.update({column: 'float64' for column in MEASURE_COLUMNS})
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=dtype):
+        chunk['Date'] = ingest.parse_dates(chunk['Date'])
+        # 날짜가 빈 행(NaT)은 어느 연/월 파티션·기간에도 속하지 않으므로 수집하지 않는다
+        if chunk['Date'].isna().any():
+            chunk = chunk[chunk['Date'].notna()].reset_index(drop=True)
+        yield chunk
+
+
+def _swap_in(staging, store_dir, names):
+    # 새로 만든 디렉터리를 제자리로 옮기고, 기존 것은 staging 아래로 밀어내 함께 지운다
+    previous = staging / 'previous'
+    previous.mkdir()
+    for name in names:
+        if (store_dir / name).exists():
+            os.replace(store_dir / name, previous / name)
+        os.replace(staging / name, store_dir / name)
+
+
+def stream_csv(path, store_dir, chunksize=CHUNK_SIZE, freq='D'):
+    # 파티션과 큐브는 저장소 안의 임시 디렉터리에 모두 만든 뒤 기존 rows/·cube/와 바꿔 끼우고,
+    # 매니페스트는 마지막에 쓴다. 도중에 실패해도 반쯤 만든 저장소나 이전 수집분과 섞인 파티션이 남지 않는다.
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    digest = file_hash(path)
+    staging = Path(tempfile.mkdtemp(prefix='.tmp-', dir=store_dir))
+    try:
+        dictionaries = new_dictionaries()
+        partials, partial_rows, total_rows = [], 0, 0
+
+        for number, chunk in enumerate(read_csv_chunks(path, chunksize)):
+            write_partitions(chunk, staging / 'rows', f"{digest[:12]}-{number}")
+            partials.append(cube.aggregate(encode_chunk(chunk, dictionaries), freq))
+            partial_rows += len(partials[-1])
+            total_rows += len(chunk)
+            if partial_rows > MAX_PARTIAL_ROWS:
+                partials = [merge_aggregates(partials, dictionaries)]
+                partial_rows = len(partials[0])
+
+        aggregated = merge_aggregates(partials, dictionaries)
+        cube.TradeCube.from_aggregated(aggregated, freq).save(staging / 'cube')
+
+        # 바꿔 끼우는 동안에는 저장소로 인식되지 않도록 기존 매니페스트부터 치운다
+        (store_dir / 'manifest.json').unlink(missing_ok=True)
+        _swap_in(staging, store_dir, ['rows', 'cube'])
+        write_manifest(store_dir, {'hash': digest, 'rows': total_rows, 'freq': freq, 'sources': [Path(path).name]})
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return store_dir
+
+
+def load_cube(store_dir):
+    return cube.TradeCube.load(Path(store_dir) / 'cube')
+
+
+def _month_bound(field_year, field_month, timestamp, lower):
+    if lower:
+        return (field_year > timestamp.year) | ((field_year == timestamp.year) & (field_month >= timestamp.month))
+    return (field_year < timestamp.year) | ((field_year == timestamp.year) & (field_month <= timestamp.month))
+
+
+def read_partitions(store_dir, start=None, end=None, filters=None, columns=None):
+    # 기간에 걸친 연/월 파티션만 읽고, 컬럼 조건은 Parquet 통계로 걸러낸다
+    # filters: 컬럼 -> 값(같음) 또는 값 목록(isin, 빈 목록은 조건 없음)
+    dataset = ds.dataset(Path(store_dir) / 'rows', format='parquet', partitioning='hive')
+    year, month, date = ds.field('Year'), ds.field('Month'), ds.field('Date')
+
+    conditions = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions += [_month_bound(year, month, start, True), date >= start.to_pydatetime()]
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions += [_month_bound(year, month, end, False), date <= end.to_pydatetime()]
+    for column, value in (filters or {}).items():
+        if isinstance(value, (list, tuple)):
+            if value:
+                conditions.append(ds.field(column).isin(list(value)))
+        else:
+            conditions.append(ds.field(column) == value)
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    table = dataset.to_table(columns=columns, filter=expression)
+    frame = table.to_pandas().drop(columns=['Year', 'Month'], errors='ignore')
+    if 'Date' not in frame.columns:
+        return frame
+    return frame.sort_values('Date', kind='stable', ignore_index=True)
+
+
+def row_hashes(frame, key):
+    # 파티션에서 읽은 값과 CSV에서 읽은 값이 같은 해시가 되도록 타입을 맞춘다
+    normalized = {}
+    for column in key:
+        values = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.astype('datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(values):
+            # 정수로 읽힌 추가분과 실수로 저장된 이력이 같은 값이면 같은 해시가 되도록
+            values = values.astype('float64')
+        else:
+            values = values.astype(object)
+        normalized[column] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(normalized), index=False).to_numpy()
+
+
+def _stored_hashes(store_dir, months, key):
+    # months: 연*12 + (월-1) 코드. 해당 월 파티션의 기준 컬럼만 읽는다
+    year, month = ds.field('Year'), ds.field('Month')
+    expression = None
+    for code in months:
+        condition = (year == int(code // 12)) & (month == int(code % 12 + 1))
+        expression = condition if expression is None else expression | condition
+    dataset = ds.dataset(Path(store_dir) / 'rows', format='parquet', partitioning='hive')
+    return row_hashes(dataset.to_table(columns=key, filter=expression).to_pandas(), key)
+
+
+def append_csv(source, store_dir, key=DEDUP_KEY, chunksize=CHUNK_SIZE):
+    # 추가분만 읽어 중복을 걸러내고, 새 행만 파티션과 큐브에 반영한다
+    store_dir = Path(store_dir)
+    manifest = read_manifest(store_dir)
+    digest = source_hash(source)
+    trade_cube = load_cube(store_dir)
+    dictionaries = {
+        column: trade_cube.dictionaries[column]
+        for column in ingest.CATEGORY_COLUMNS
+    }
+
+    known = np.empty(0, dtype=np.uint64)
+    loaded_months = set()
+    if 'Date' not in key:
+        # 날짜가 기준에 없으면 전체 이력과 한 번은 비교해야 한다
+        known = np.unique(row_hashes(read_partitions(store_dir, columns=key), key))
+
+    partials, partial_rows = [], 0
+    received = appended = 0
+    for number, chunk in enumerate(read_csv_chunks(source, chunksize)):
+        received += len(chunk)
+        if 'Date' in key:
+            months = set((chunk['Date'].dt.year * 12 + chunk['Date'].dt.month - 1).unique().tolist()) - loaded_months
+            if months:
+                known = np.union1d(known, _stored_hashes(store_dir, sorted(months), key))
+                loaded_months |= months
+
+        hashes = row_hashes(chunk, key)
+        fresh = ~np.isin(hashes, known) & ~pd.Series(hashes).duplicated().to_numpy()
+        known = np.union1d(known, hashes[fresh])
+        chunk = chunk[fresh].reset_index(drop=True)
+        if chunk.empty:
+            continue
+
+        write_partitions(chunk, store_dir / 'rows', f"{digest[:12]}-{number}")
+        partials.append(cube.aggregate(encode_chunk(chunk, dictionaries), manifest['freq']))
+        partial_rows += len(partials[-1])
+        appended += len(chunk)
+        if partial_rows > MAX_PARTIAL_ROWS:
+            partials = [merge_aggregates(partials, dictionaries)]
+            partial_rows = len(partials[0])
+
+    if appended:
+        # 추가분 집계만 만들어 기존 큐브의 해당 키 구간에 끼워 넣는다 (원본 이력·기존 칸은 다시 묶지 않음)
+        delta = merge_aggregates(partials, dictionaries)
+        trade_cube.merge(delta, dictionaries).save(store_dir / 'cube')
+        manifest['hash'] = hashlib.blake2b((manifest['hash'] + digest).encode(), digest_size=20).hexdigest()
+        manifest['rows'] += appended
+        manifest['sources'].append(Path(getattr(source, 'name', str(source))).name)
+        write_manifest(store_dir, manifest)
+    return {'received': received, 'appended': appended, 'duplicates': received - appended}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="대용량 CSV 스트리밍 수집 (연/월 파티션 + 거래 큐브)")
+    parser.add_argument('input', help="원본 CSV 파일 (--append 시 추가분 파일)")
+    parser.add_argument('store', help="저장소 디렉터리")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="청크당 행 수")
+    parser.add_argument('--freq', choices=['D', 'M'], default='D', help="큐브 집계 단위 (일/월)")
+    parser.add_argument('--append', action='store_true', help="기존 저장소에 추가분만 증분 반영")
+    parser.add_argument('--key', nargs='+', default=DEDUP_KEY, help="중복 판정 기준 컬럼 (--append)")
+    args = parser.parse_args(argv)
+
+    if args.append:
+        result = append_csv(args.input, args.store, args.key, args.chunksize)
+        print(f"{result['received']:,}행 중 {result['appended']:,}행 추가, 중복 {result['duplicates']:,}행 제외")
+        return
+
+    stream_csv(args.input, args.store, args.chunksize, args.freq)
+    manifest = read_manifest(args.store)
+    print(f"{manifest['rows']:,}행 수집 완료 -> {args.store}")
+
+
+if __name__ == '__main__':
+    main()
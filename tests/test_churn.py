@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+import churn
+import cube
+import ingest
+import radar
+from test_radar import FILTERS, synthetic_trades
+
+# --- 월말 이탈 시계열 ---
+# churn_series가 월말마다 낸 개수가, 같은 월말·기간으로 수입사 레이더와 수입사 상세 표를
+# 따로 계산해 센 값과 같은지 비교한다. 블록 크기를 작게 잡아 수입사 경계에서 끊어 읽는 경로도 함께 본다.
+
+
+@pytest.fixture(scope='module')
+def trade_cube():
+    return cube.TradeCube.build(ingest.normalize(synthetic_trades()))
+
+
+def month_windows(month_end, months):
+    # 월말 기준 최근 months개월 vs 바로 직전 months개월 (달력 월 단위)
+    curr = ((month_end - months + 1).to_timestamp(), month_end.to_timestamp(how='end').normalize())
+    past = ((month_end - 2 * months + 1).to_timestamp(), (month_end - months).to_timestamp(how='end').normalize())
+    return curr, past
+
+
+def expected_counts(trade_cube, key_ids, month_end, months):
+    curr, past = month_windows(month_end, months)
+    imp_result_df = radar.cube_importer_radar(*radar.cube_windows(trade_cube, key_ids, curr, past))
+    counts = {
+        'Decreased Importers': len(imp_result_df),
+        'Stopped Importers': int(imp_result_df['Is Stopped'].sum()),
+        'Lost Volume': round(imp_result_df['Volume Decrease'].sum(), 2),
+    }
+    trends = pd.Series(0, index=radar.TRENDS)
+    if len(imp_result_df):
+        final_imp_df = radar.cube_importer_table(trade_cube, key_ids, imp_result_df['Raw Importer Name'].to_numpy(), curr, past)
+        trends = final_imp_df['세부 추이'].value_counts().reindex(radar.TRENDS, fill_value=0)
+    return counts, trends
+
+
+@pytest.mark.parametrize('block_keys', [churn.BLOCK_KEYS, 5])
+@pytest.mark.parametrize('filters', FILTERS)
+def test_churn_matches_radar(trade_cube, filters, block_keys):
+    key_ids = trade_cube.select(filters)
+    ends = churn.month_ends(trade_cube.last_date, years=2)
+    churn_df = churn.churn_series(trade_cube, key_ids, ends, block_keys=block_keys)
+    assert len(churn_df) == len(ends) * len(churn.WINDOW_MONTHS)
+
+    for option, months in churn.WINDOW_MONTHS.items():
+        series = churn_df[churn_df['Window'] == option].reset_index(drop=True)
+        for number in range(0, len(ends), 7):
+            counts, trends = expected_counts(trade_cube, key_ids, ends[number], months)
+            row = series.loc[number]
+            assert row['Month End'] == ends[number].to_timestamp(how='end').normalize()
+            assert {column: row[column] for column in churn.COUNT_COLUMNS} == pytest.approx(counts)
+            assert row[radar.TRENDS].tolist() == trends.astype(int).tolist()
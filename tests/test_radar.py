@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cube
+import dataset
+import ingest
+import radar
+
+# --- 레이더 엔진 동등성 ---
+# 기준(reference)은 엔진 도입 전 app.py의 인라인 연산을 그대로 옮긴 것이다. 엔진(큐브 경로)이
+# 기간 옵션·필터 조합마다 같은 레이더 요약과 상세 표를 내는지 비교한다.
+
+FILTERS = [{}, {'HS-CODE': [1001]}, {'Category': ['A'], 'Origin Country': ['CN', 'VN']}]
+
+
+def synthetic_trades(rows=6000, seed=0):
+    # 결측 수출국가/수출사/수입사 행을 섞은 4년치 거래
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Date': (pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 365 * 4, rows), unit='D')).strftime('%Y-%m-%d'),
+        'HS-CODE': rng.choice([1001, 1002, 2001], rows),
+        'Category': rng.choice(['A', 'B'], rows),
+        'Origin Country': rng.choice(['CN', 'VN', 'US'], rows),
+        'Export Country': rng.choice(['CN', 'VN', 'US', 'DE'], rows).astype(object),
+        'Exporter': np.array([f"EXP{number}" for number in rng.integers(0, 40, rows)], dtype=object),
+        'Raw Importer Name': np.array([f"IMP{number}" for number in rng.integers(0, 80, rows)], dtype=object),
+        'Volume': np.round(rng.gamma(2, 500, rows), 1),
+        'Value': np.round(rng.gamma(2, 2000, rows), 1),
+    })
+    df['Unit Price'] = df['Value'] / df['Volume']
+    df.loc[rng.random(rows) < 0.03, 'Export Country'] = np.nan
+    df.loc[rng.random(rows) < 0.03, 'Exporter'] = np.nan
+    df.loc[rng.random(rows) < 0.02, 'Raw Importer Name'] = np.nan
+    return df
+
+
+def get_line_trend(row):
+    if row['Past Volume'] == 0 and row['Current Volume'] > 0:
+        return "🆕 신규 거래"
+    elif row['Current Volume'] == 0 and row['Past Volume'] > 0:
+        return "🛑 거래 중단"
+    elif row['Volume Change'] > 0:
+        return "🔼 물량 확대"
+    elif row['Volume Change'] < 0:
+        return "🔽 물량 축소"
+    else:
+        return "➖ 유지 (변동 없음)"
+
+
+def reference_radar(df, filters, curr_start, curr_end, past_start, past_end):
+    filtered_df = df.copy()
+    for column, values in filters.items():
+        filtered_df = filtered_df[filtered_df[column].isin(values)]
+
+    curr_df = filtered_df[(filtered_df['Date'] >= curr_start) & (filtered_df['Date'] <= curr_end)].copy()
+    past_df = filtered_df[(filtered_df['Date'] >= past_start) & (filtered_df['Date'] <= past_end)].copy()
+
+    imp_curr_vol = curr_df.groupby('Raw Importer Name')['Volume'].sum().reset_index().rename(columns={'Volume': 'Current Volume'})
+    imp_past_vol = past_df.groupby('Raw Importer Name')['Volume'].sum().reset_index().rename(columns={'Volume': 'Past Volume'})
+    imp_result_df = pd.merge(imp_past_vol, imp_curr_vol, on='Raw Importer Name', how='outer').fillna(0)
+    imp_result_df['Volume Decrease'] = imp_result_df['Past Volume'] - imp_result_df['Current Volume']
+    imp_result_df = imp_result_df[imp_result_df['Volume Decrease'] > 0]
+    imp_result_df['Is Stopped'] = imp_result_df['Current Volume'] == 0
+
+    final_imp_df = None
+    if not imp_result_df.empty:
+        target_importers = imp_result_df['Raw Importer Name'].tolist()
+        imp_detail_df = filtered_df[filtered_df['Raw Importer Name'].isin(target_importers)].copy()
+        imp_detail_df['Export Country'] = imp_detail_df['Export Country'].fillna('Unknown')
+        imp_detail_df['Exporter'] = imp_detail_df['Exporter'].fillna('Unknown')
+        imp_detail_df['Exporter Line'] = "[" + imp_detail_df['Export Country'] + "] " + imp_detail_df['Exporter']
+
+        imp_curr_detail = imp_detail_df[(imp_detail_df['Date'] >= curr_start) & (imp_detail_df['Date'] <= curr_end)].groupby(['Raw Importer Name', 'Exporter Line'])['Volume'].sum().reset_index(name='Current Volume')
+        imp_past_detail = imp_detail_df[(imp_detail_df['Date'] >= past_start) & (imp_detail_df['Date'] <= past_end)].groupby(['Raw Importer Name', 'Exporter Line'])['Volume'].sum().reset_index(name='Past Volume')
+        imp_merged = pd.merge(imp_past_detail, imp_curr_detail, on=['Raw Importer Name', 'Exporter Line'], how='outer').fillna(0)
+        imp_merged['Volume Change'] = imp_merged['Current Volume'] - imp_merged['Past Volume']
+        imp_merged['세부 추이'] = imp_merged.apply(get_line_trend, axis=1)
+
+        imp_period_avg = imp_detail_df.groupby(['Raw Importer Name', 'Exporter Line', imp_detail_df['Date'].dt.to_period('Y')])['Volume'].sum().reset_index()
+        imp_avg_vol = imp_period_avg.groupby(['Raw Importer Name', 'Exporter Line'])['Volume'].mean().reset_index(name='Avg Volume')
+        imp_price_stats = imp_detail_df.groupby(['Raw Importer Name', 'Exporter Line']).apply(
+            lambda x: pd.Series({
+                'Arithmetic Avg Price': x['Unit Price'].mean(),
+                'Weighted Avg Price': x['Value'].sum() / x['Volume'].sum() if x['Volume'].sum() > 0 else 0
+            })
+        ).reset_index()
+
+        final_imp_df = imp_merged.merge(imp_avg_vol, on=['Raw Importer Name', 'Exporter Line'], how='left') \
+                                 .merge(imp_price_stats, on=['Raw Importer Name', 'Exporter Line'], how='left')
+        num_cols_imp = ['Current Volume', 'Past Volume', 'Volume Change', 'Avg Volume', 'Arithmetic Avg Price', 'Weighted Avg Price']
+        final_imp_df[num_cols_imp] = final_imp_df[num_cols_imp].round(2)
+        imp_total_decrease = final_imp_df.groupby('Raw Importer Name')['Volume Change'].sum().reset_index(name='Total Decrease')
+        final_imp_df = final_imp_df.merge(imp_total_decrease, on='Raw Importer Name')
+        final_imp_df = final_imp_df.sort_values(by=['Total Decrease', 'Raw Importer Name', 'Volume Change'], ascending=[True, True, False])
+        final_imp_df = final_imp_df[['Raw Importer Name', '세부 추이', 'Exporter Line', 'Past Volume', 'Current Volume', 'Volume Change', 'Avg Volume', 'Arithmetic Avg Price', 'Weighted Avg Price']]
+        final_imp_df = final_imp_df.rename(columns=radar.IMPORTER_COLUMNS).set_index(['수입업체명'])
+
+    curr_df['Export Country'] = curr_df['Export Country'].fillna('Unknown')
+    past_df['Export Country'] = past_df['Export Country'].fillna('Unknown')
+    exp_curr_total = curr_df.groupby(['Export Country', 'Exporter'])['Volume'].sum().reset_index(name='Current Total')
+    exp_past_total = past_df.groupby(['Export Country', 'Exporter'])['Volume'].sum().reset_index(name='Past Total')
+    exp_radar = pd.merge(exp_past_total, exp_curr_total, on=['Export Country', 'Exporter'], how='outer').fillna(0)
+    exp_radar['Total Decrease'] = exp_radar['Past Total'] - exp_radar['Current Total']
+    exp_radar = exp_radar[exp_radar['Total Decrease'] > 0]
+
+    final_exp_df = None
+    if not exp_radar.empty:
+        target_exporters = exp_radar['Exporter'].tolist()
+        exp_detail_df = filtered_df[filtered_df['Exporter'].isin(target_exporters)].copy()
+        exp_detail_df['Export Country'] = exp_detail_df['Export Country'].fillna('Unknown')
+        exp_curr_detail = exp_detail_df[(exp_detail_df['Date'] >= curr_start) & (exp_detail_df['Date'] <= curr_end)].groupby(['Export Country', 'Exporter', 'Raw Importer Name'])['Volume'].sum().reset_index(name='Current Volume')
+        exp_past_detail = exp_detail_df[(exp_detail_df['Date'] >= past_start) & (exp_detail_df['Date'] <= past_end)].groupby(['Export Country', 'Exporter', 'Raw Importer Name'])['Volume'].sum().reset_index(name='Past Volume')
+        exp_merged = pd.merge(exp_past_detail, exp_curr_detail, on=['Export Country', 'Exporter', 'Raw Importer Name'], how='outer').fillna(0)
+        exp_merged['Volume Change'] = exp_merged['Current Volume'] - exp_merged['Past Volume']
+        exp_merged['Trend'] = exp_merged.apply(get_line_trend, axis=1)
+
+        final_exp_df = exp_merged.copy()
+        num_cols_exp = ['Past Volume', 'Current Volume', 'Volume Change']
+        final_exp_df[num_cols_exp] = final_exp_df[num_cols_exp].round(2)
+        exp_total_decrease = final_exp_df.groupby(['Export Country', 'Exporter'])['Volume Change'].sum().reset_index(name='Total Decrease')
+        final_exp_df = final_exp_df.merge(exp_total_decrease, on=['Export Country', 'Exporter'])
+        final_exp_df = final_exp_df.sort_values(by=['Total Decrease', 'Export Country', 'Exporter', 'Volume Change'], ascending=[True, True, True, False])
+        final_exp_df = final_exp_df[['Export Country', 'Exporter', 'Trend', 'Raw Importer Name', 'Past Volume', 'Current Volume', 'Volume Change']]
+        final_exp_df = final_exp_df.rename(columns=radar.EXPORTER_COLUMNS).set_index(['수출국가', '해외 수출사'])
+
+    return imp_result_df, final_imp_df, exp_radar, final_exp_df
+
+
+def normalized(table, order=None):
+    # 이름 컬럼은 문자열로 맞추고(엔진은 카테고리/코드에서 되돌린 값), 요약 표는 이름순으로 비교
+    table = table.reset_index() if table.index.names[0] is not None else table.reset_index(drop=True)
+    for column in table.columns:
+        if table[column].dtype.kind not in 'fib':
+            table[column] = table[column].astype(str)
+    if order:
+        table = table.sort_values(order)
+    return table.reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def trades():
+    raw = synthetic_trades()
+    raw['Date'] = pd.to_datetime(raw['Date'])
+    # 대시보드와 같은 경로: 수집 캐시 정규화(날짜 정렬·카테고리) -> 큐브
+    return raw, cube.TradeCube.build(ingest.normalize(synthetic_trades()))
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('period_option', list(radar.PERIOD_LENGTHS))
+def test_dual_radar_matches_reference(trades, period_option, filters):
+    raw, trade_cube = trades
+    curr, past = radar.period_windows(period_option, raw['Date'].max())
+    expected = reference_radar(raw, filters, *curr, *past)
+
+    imp_result_df, final_imp_df, exp_radar, final_exp_df = radar.cube_dual_radar(trade_cube, trade_cube.select(filters), curr, past)
+
+    pd.testing.assert_frame_equal(
+        normalized(radar.decode_entities(imp_result_df, trade_cube), ['Raw Importer Name']),
+        normalized(expected[0], ['Raw Importer Name']),
+        check_dtype=False,
+    )
+    pd.testing.assert_frame_equal(
+        normalized(radar.decode_entities(exp_radar, trade_cube), ['Export Country', 'Exporter']),
+        normalized(expected[2], ['Export Country', 'Exporter']),
+        check_dtype=False,
+    )
+    for actual, reference in ((final_imp_df, expected[1]), (final_exp_df, expected[3])):
+        assert (actual is None) == (reference is None)
+        if reference is not None:
+            pd.testing.assert_frame_equal(normalized(actual), normalized(reference), check_dtype=False)
+
+
+def test_reference_includes_missing_names(trades):
+    raw, _ = trades
+    assert raw[['Export Country', 'Exporter', 'Raw Importer Name']].isna().any().all()
+
+
+def test_missing_dates_are_left_out(trades):
+    # 날짜가 빈 행은 어느 기간에도 속하지 않는다: 그 행을 뺀 기준 결과와 같아야 한다
+    raw, _ = trades
+    undated = synthetic_trades()
+    undated.loc[::250, 'Date'] = np.nan
+    normalized_df = ingest.normalize(undated.copy())
+    trade_cube = cube.TradeCube.build(normalized_df)
+    assert trade_cube.last_date == raw['Date'].max()
+    assert dataset.TradeDataset(normalized_df).last_date == raw['Date'].max()
+
+    dated = undated[undated['Date'].notna()].assign(Date=lambda frame: pd.to_datetime(frame['Date']))
+    curr, past = radar.period_windows("최근 1년", trade_cube.last_date)
+    expected = reference_radar(dated, {}, *curr, *past)
+    imp_result_df, final_imp_df, exp_radar, final_exp_df = radar.cube_dual_radar(trade_cube, trade_cube.select(), curr, past)
+
+    pd.testing.assert_frame_equal(
+        normalized(radar.decode_entities(imp_result_df, trade_cube), ['Raw Importer Name']),
+        normalized(expected[0], ['Raw Importer Name']),
+        check_dtype=False,
+    )
+    pd.testing.assert_frame_equal(normalized(final_imp_df), normalized(expected[1]), check_dtype=False)
+    pd.testing.assert_frame_equal(normalized(final_exp_df), normalized(expected[3]), check_dtype=False)
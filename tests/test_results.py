@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import results
+
+# --- 레이더 결과 공유 캐시 ---
+# 메모리 계층의 LRU 순서와 바이트 한도, 디스크 계층의 왕복(다시 띄운 캐시에서 읽기)과
+# 결과 키가 형식 버전·조합을 구분하는지 확인한다.
+
+
+def sample_tables(seed, rows=200):
+    rng = np.random.default_rng(seed)
+    imp = pd.DataFrame({
+        'Raw Importer Name': [f"IMP{number}" for number in rng.integers(0, 50, rows)],
+        'Past Volume': rng.gamma(2, 500, rows),
+        'Is Stopped': rng.random(rows) < 0.2,
+    })
+    exp = pd.DataFrame(
+        {'Current Total': rng.gamma(2, 500, rows)},
+        index=pd.MultiIndex.from_arrays(
+            [rng.choice(['CN', 'VN'], rows), [f"EXP{number}" for number in rng.integers(0, 20, rows)]],
+            names=['Export Country', 'Exporter'],
+        ),
+    )
+    return imp, None, exp
+
+
+def test_lru_evicts_least_recently_used():
+    size = results.tables_size(sample_tables(0))
+    cache = results.ResultCache(max_bytes=int(size * 2.5), disk_dir=None)
+    cache.put('a', sample_tables(0))
+    cache.put('b', sample_tables(1))
+    assert cache.get('a') is not None
+
+    cache.put('c', sample_tables(2))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    stats = cache.stats()
+    assert (stats['entries'], stats['evictions'], stats['misses']) == (2, 1, 1)
+
+
+def test_memory_stays_within_budget():
+    size = results.tables_size(sample_tables(0))
+    cache = results.ResultCache(max_bytes=size * 3, disk_dir=None)
+    for number in range(10):
+        cache.put(str(number), sample_tables(number))
+        assert cache.bytes <= cache.max_bytes
+    assert cache.bytes == sum(results.tables_size(cache.get(key)) for key in ['7', '8', '9'])
+
+    # 한도보다 큰 결과는 메모리에 두지 않고 그대로 돌려준다
+    large = sample_tables(0, rows=5000)
+    assert cache.put('large', large) == large
+    assert cache.get('large') is None and cache.bytes <= cache.max_bytes
+
+
+def test_disk_round_trip(tmp_path):
+    tables = sample_tables(0)
+    results.ResultCache(disk_dir=tmp_path).put('key', tables)
+
+    restarted = results.ResultCache(disk_dir=tmp_path)
+    loaded = restarted.get('key')
+    assert restarted.stats()['disk_hits'] == 1 and loaded[1] is None
+    pd.testing.assert_frame_equal(loaded[0], tables[0])
+    pd.testing.assert_frame_equal(loaded[2], tables[2])
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith(results.TMP_PREFIX)]
+
+
+def test_disk_trim_drops_oldest(tmp_path):
+    cache = results.ResultCache(disk_dir=tmp_path)
+    for number in range(3):
+        cache.put(str(number), sample_tables(number))
+        os.utime(tmp_path / str(number), (number, number))
+    entry_size = results._dir_size(tmp_path / '0')
+
+    cache.disk_bytes = int(entry_size * 2.5)
+    cache._trim_disk()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['1', '2']
+
+
+def test_result_key_separates_versions_and_kinds(monkeypatch):
+    window = [pd.Timestamp('2023-01-01'), pd.Timestamp('2023-12-31')]
+    key = results.result_key('data', {'HS-CODE': [1002, 1001]}, window, window)
+    assert key == results.result_key('data', {'HS-CODE': [1001, 1002], 'Category': []}, window, window)
+    assert key != results.result_key('data', {'HS-CODE': [1001, 1002]}, window, window, kind='churn')
+
+    monkeypatch.setitem(results.FORMAT_VERSIONS, 'radar', results.FORMAT_VERSIONS['radar'] + 1)
+    assert key != results.result_key('data', {'HS-CODE': [1001, 1002]}, window, window)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import radar
+import store
+from test_radar import normalized, synthetic_trades
+
+# --- 스트리밍 저장소 ---
+# 청크 단위 수집(stream_csv)이 다시 수집해도 이전 파티션과 섞이지 않고,
+# 날짜가 빈 행은 파티션·큐브 어디에도 들어가지 않는지 확인한다. 증분 추가(append_csv)는
+# 같은 행 전체를 한 번에 수집한 저장소와 같은 레이더 결과를 내야 한다.
+
+
+def whole_volumes(rows, seed):
+    # 정수로 떨어지는 거래량/금액: CSV에 '1234.0'(이력)과 '1234'(추가분) 두 표기로 쓸 수 있다
+    df = synthetic_trades(rows=rows, seed=seed)
+    df['Volume'] = np.round(df['Volume'])
+    df['Value'] = np.round(df['Value'])
+    return df
+
+
+def as_integers(df):
+    return df.assign(Volume=df['Volume'].astype('int64'), Value=df['Value'].astype('int64'))
+
+
+def radar_tables(trade_cube, period_option):
+    curr, past = radar.period_windows(period_option, trade_cube.last_date)
+    imp_result_df, final_imp_df, _, final_exp_df = radar.cube_dual_radar(trade_cube, trade_cube.select(), curr, past)
+    # 두 저장소는 사전 코드 순서가 다르므로 모든 컬럼 기준으로 정렬해 비교한다 (해당 없는 표는 None)
+    tables = [radar.decode_entities(imp_result_df, trade_cube), final_imp_df, final_exp_df]
+    return [
+        None if table is None else normalized(table).pipe(lambda frame: frame.sort_values(list(frame.columns), ignore_index=True))
+        for table in tables
+    ]
+
+
+def test_restream_replaces_rows(tmp_path):
+    raw = synthetic_trades(rows=3000)
+    raw.loc[::200, 'Date'] = np.nan
+    raw.to_csv(tmp_path / 'trades.csv', index=False)
+    dated = raw[raw['Date'].notna()]
+
+    store_dir = tmp_path / 'store'
+    for _ in range(2):
+        store.stream_csv(tmp_path / 'trades.csv', store_dir, chunksize=700)
+        assert store.read_manifest(store_dir)['rows'] == len(dated)
+        assert len(store.read_partitions(store_dir)) == len(dated)
+
+    assert sorted(path.name for path in store_dir.iterdir()) == ['cube', 'manifest.json', 'rows']
+    assert store.load_cube(store_dir).last_date == pd.to_datetime(dated['Date']).max()
+
+
+@pytest.fixture
+def appended_store(tmp_path):
+    # 이력 2,400행 + 추가분: 기존 월과 겹치는 날짜, 이력보다 이른 날짜, 새 수입사/HS-CODE, 빈 이름,
+    # 이미 수집된 200행(정수 표기)이 섞여 있다
+    history = whole_volumes(2400, seed=1)
+    history = history[history['Date'] >= '2020-07-01']
+    fresh = whole_volumes(800, seed=2)
+    fresh.loc[fresh.index[:100], 'Raw Importer Name'] = [f"NEW{number % 7}" for number in range(100)]
+    fresh.loc[fresh.index[100:150], 'HS-CODE'] = 3001
+    fresh.loc[fresh.index[150:200], 'Date'] = (pd.Timestamp('2019-11-01') + pd.to_timedelta(np.arange(50), unit='D')).strftime('%Y-%m-%d')
+    fresh.loc[fresh.index[200:260], ['Raw Importer Name', 'Exporter']] = np.nan
+
+    history.to_csv(tmp_path / 'history.csv', index=False)
+    as_integers(pd.concat([fresh, history.sample(200, random_state=0)])).to_csv(tmp_path / 'delta.csv', index=False)
+    pd.concat([history, fresh]).to_csv(tmp_path / 'full.csv', index=False)
+
+    store.stream_csv(tmp_path / 'history.csv', tmp_path / 'appended', chunksize=500)
+    result = store.append_csv(tmp_path / 'delta.csv', tmp_path / 'appended', chunksize=300)
+    store.stream_csv(tmp_path / 'full.csv', tmp_path / 'full', chunksize=500)
+    return tmp_path, result, len(history) + len(fresh)
+
+
+def test_append_matches_full_stream(appended_store):
+    tmp_path, result, total_rows = appended_store
+    assert result == {'received': 1000, 'appended': 800, 'duplicates': 200}
+    assert store.read_manifest(tmp_path / 'appended')['rows'] == total_rows
+
+    appended, full = store.load_cube(tmp_path / 'appended'), store.load_cube(tmp_path / 'full')
+    assert (appended.first_date, appended.last_date) == (full.first_date, full.last_date)
+    for period_option in ["최근 3개월", "최근 1년", "최근 3년"]:
+        for actual, expected in zip(radar_tables(appended, period_option), radar_tables(full, period_option)):
+            if expected is None:
+                assert actual is None
+            else:
+                pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_reappend_adds_nothing(appended_store):
+    tmp_path, _, total_rows = appended_store
+    result = store.append_csv(tmp_path / 'delta.csv', tmp_path / 'appended')
+    assert result == {'received': 1000, 'appended': 0, 'duplicates': 1000}
+    assert store.read_manifest(tmp_path / 'appended')['rows'] == total_rows
+    assert len(store.read_partitions(tmp_path / 'appended')) == total_rows
+
+
+def test_row_hashes_ignore_integer_reads():
+    frame = whole_volumes(50, seed=3).assign(Date=lambda df: pd.to_datetime(df['Date']))
+    assert (store.row_hashes(as_integers(frame), store.DEDUP_KEY) == store.row_hashes(frame, store.DEDUP_KEY)).all()